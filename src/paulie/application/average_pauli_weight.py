@@ -2,20 +2,28 @@
     Module to compute the average Pauli weight (influence) 
     and quantum Fourier entropy of an operator O.
 """
-from itertools import product
 import numpy as np
-from paulie.application.matrix_decomposition import matrix_decomposition
+from paulie.application.matrix_decomposition import matrix_decomposition, pauli_coefficients
 from paulie.common.pauli_string_bitarray import PauliString
 
-def quantum_fourier_entropy(o: np.ndarray) -> float:
+def quantum_fourier_entropy(o: np.ndarray, dtype: np.dtype = np.complex128) -> float:
     """
     Calculates the quantum Fourier entropy of an operator O.
     H(O) = -sum_P c_P**2 * log(c_P**2)
+    The precision dtype is passed to matrix_decomposition.
     """
     # Get the coefficients c_P from the Pauli decomposition
-    c_p = matrix_decomposition(o)
+    c_p = matrix_decomposition(o, dtype=dtype)
+    return get_fourier_entropy(c_p)
+
+
+def get_fourier_entropy(coeffs: np.ndarray) -> float:
+    """
+    Calculates the quantum Fourier entropy from the coefficients c_P of the Pauli decomposition.
+    H(O) = -sum_P c_P**2 * log(c_P**2)
+    """
     # Calculate the probabilities p_P = c_P^2
-    probs = np.abs(c_p)**2
+    probs = np.abs(coeffs)**2
     # Filter out zero probabilities to avoid log(0)
     non_zero_probs = probs[probs > 1e-12]
     # Calculate the Shannon entropy using base 2 for the logarithm
@@ -23,26 +31,18 @@ def quantum_fourier_entropy(o: np.ndarray) -> float:
     return entropy
 
 
-def avg_pauli_weights(o: np.ndarray) -> np.ndarray:
+def avg_pauli_weights(o: np.ndarray, dtype: np.dtype = np.complex128) -> np.ndarray:
     """
     Calculate the average Pauli weights of an operator O.
     I(O) = sum_P |P| * c_P**2
+    The precision dtype is passed to matrix_decomposition.
     """
     # Get the coefficients c_P from the Pauli decomposition
-    c_ps = matrix_decomposition(o)
+    c_ps = matrix_decomposition(o, dtype=dtype)
     # Get the number of qubits from the matrix decomposition
     # 4 Pauli matrices yield 4**n_qubits options
-    dim = c_ps.shape[0]
-    n_qubits = int(np.emath.logn(4, dim))
-    # get all options of Pauli Strings for n_qubits
-    pauli_strings = product('IXYZ', repeat=n_qubits)
-    i = 0
-    for pauli_str in pauli_strings:
-        pl = PauliString(pauli_str=pauli_str)
-        c_p = pl.get_weight_in_matrix(c_ps)
-        abs_p = pl.get_count_non_trivially()
-        i += abs(c_p) ** 2 * abs_p
-    return i
+    n_qubits = (c_ps.shape[0].bit_length() - 1) // 2
+    return np.sum(get_pauli_weights(n_qubits) * np.abs(c_ps) ** 2)
 
 
 def avg_pauli_weights_from_strings(o: np.ndarray, pauli_strings: list) -> np.ndarray:
@@ -51,17 +51,11 @@ def avg_pauli_weights_from_strings(o: np.ndarray, pauli_strings: list) -> np.nda
     This is useful to reduce the calculation, when testing.
     I(O) = sum_P |P| * c_P**2
     """
-    # Get the coefficients c_P from the Pauli decomposition
-    c_ps = matrix_decomposition(o)
-    # get all options of Pauli Strings for n_qubits
-    i = 0
-    for pauli_str in pauli_strings:
-        pauli_str = ''.join(pauli_str)
-        pl = PauliString(pauli_str=pauli_str)
-        c_p = pl.get_weight_in_matrix(c_ps)
-        abs_p = pl.get_count_non_trivially()
-        i += abs(c_p) ** 2 * abs_p
-    return i
+    pauli_strings = [PauliString(pauli_str=''.join(pauli_str)) for pauli_str in pauli_strings]
+    # Get only the coefficients c_P of the given Pauli strings
+    c_ps = pauli_coefficients(o, pauli_strings)
+    abs_ps = np.array([pl.get_count_non_trivially() for pl in pauli_strings])
+    return np.sum(np.abs(c_ps) ** 2 * abs_ps)
 
 
 
@@ -73,27 +67,27 @@ def get_pauli_weights(num_qubits: int, identity_pos: int=0) -> np.ndarray:
     Generates the weight |P| for each of the 4**num_qubits Pauli operators.
     The weight is the number of non-identity terms in the Pauli string.
     The ordering corresponds to the output of matrix_decomposition, default is 'I' at position 0.
+    The weights of n qubits are the outer sum of the weights of n - 1 qubits
+    and the weights of one qubit.
     """
-    num_paulis = 4**num_qubits
-    weights = np.zeros(num_paulis, dtype=int)
-    for i in range(num_paulis):
-        weight = 0
-        temp_i = i
-        # Convert index to base 4, number of non-zero digits is the weight
-        for _ in range(num_qubits):
-            if temp_i % 4 != identity_pos:  # Pauli I corresponds to digit "identity_pos"
-                weight += 1
-            temp_i //= 4
-        weights[i] = weight
+    single = (np.arange(4) != identity_pos).astype(int)
+    weights = np.zeros(1, dtype=int)
+    for _ in range(num_qubits):
+        weights = np.add.outer(weights, single).reshape(-1)
     return weights
 
-def average_pauli_weight(o: np.ndarray, weights: np.ndarray) -> float:
+def average_pauli_weight(o: np.ndarray, weights: np.ndarray = None,
+                         dtype: np.dtype = np.complex128) -> float:
     """
     Calculates the average Pauli weight (influence) for an operator O.
     I(O) = sum_P |P| * c_P**2
+    If the weights are not specified, then they are generated by get_pauli_weights.
+    The precision dtype is passed to matrix_decomposition.
     """
     # Get the coefficients c_P from the Pauli decomposition
-    coeffs = matrix_decomposition(o)
+    coeffs = matrix_decomposition(o, dtype=dtype)
+    if weights is None:
+        weights = get_pauli_weights((coeffs.shape[0].bit_length() - 1) // 2)
     # For a Hermitian operator O, the coefficients c_P are real.
     # The "probability" of a Pauli term P is c_P^2.
     # Note: sum(|c_P|^2) = 1 due to O^2=I.
@@ -101,3 +95,69 @@ def average_pauli_weight(o: np.ndarray, weights: np.ndarray) -> float:
     # Calculate the influence I(O)
     influence = np.sum(weights * probs)
     return influence
+
+
+##### Pauli spectrum analytics #####
+
+
+def get_weight_histogram(coeffs: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+    """
+    Calculates the weight distribution of the Pauli spectrum:
+    entry k is the sum of c_P**2 over the Pauli strings P of weight k.
+    Args:
+        coeffs: Coefficients c_P from the Pauli decomposition
+        weights: Weights |P| in the same order. If not specified, then get_pauli_weights
+    """
+    n_qubits = (coeffs.shape[0].bit_length() - 1) // 2
+    if weights is None:
+        weights = get_pauli_weights(n_qubits)
+    return np.bincount(weights, weights=np.abs(coeffs) ** 2, minlength=n_qubits + 1)
+
+
+def get_marginal_influences(coeffs: np.ndarray) -> np.ndarray:
+    """
+    Calculates the influence of every qubit q: the sum of c_P**2 over the Pauli strings P
+    acting non-trivially on q. The influences sum up to the average Pauli weight.
+    The spectrum is read once: the trailing base-4 digits of the index are summed out
+    one qubit at a time, so the partial sums shrink by 4 at every qubit and the total
+    cost is O(4^n).
+    Args:
+        coeffs: Coefficients c_P from the Pauli decomposition
+    """
+    n_qubits = (coeffs.shape[0].bit_length() - 1) // 2
+    partial = np.abs(coeffs) ** 2
+    total = np.sum(partial)
+    influences = np.zeros(n_qubits)
+    # Qubit 0 is the most significant base-4 digit of the index
+    for q in reversed(range(n_qubits)):
+        # Partial sums indexed by the digits of the qubits 0, ..., q
+        partial = partial.reshape(-1, 4)
+        influences[q] = total - partial[:, 0].sum()
+        partial = partial.sum(axis=1)
+    return influences
+
+
+def pauli_spectrum_analysis(o: np.ndarray, dtype: np.dtype = np.complex128) -> dict:
+    """
+    Calculates the analytics of the Pauli spectrum of an operator O from one decomposition.
+    The precision dtype is passed to matrix_decomposition.
+    Returns a dictionary with
+        "coefficients": coefficients c_P from the Pauli decomposition,
+        "weights": weight |P| of every Pauli string,
+        "influence": average Pauli weight I(O) = sum_P |P| * c_P**2,
+        "entropy": quantum Fourier entropy H(O) = -sum_P c_P**2 * log(c_P**2),
+        "histogram": weight distribution, see get_weight_histogram,
+        "marginal_influences": influence of every qubit, see get_marginal_influences
+    """
+    coeffs = matrix_decomposition(o, dtype=dtype)
+    n_qubits = (coeffs.shape[0].bit_length() - 1) // 2
+    weights = get_pauli_weights(n_qubits)
+    histogram = get_weight_histogram(coeffs, weights)
+    return {
+        "coefficients": coeffs,
+        "weights": weights,
+        "influence": np.dot(np.arange(n_qubits + 1), histogram),
+        "entropy": get_fourier_entropy(coeffs),
+        "histogram": histogram,
+        "marginal_influences": get_marginal_influences(coeffs),
+    }
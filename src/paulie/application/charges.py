@@ -2,7 +2,6 @@
     Non-commuting charges describe non-Abelian symmetries — that is, elements of the
     stabilizer of the DLA that do not commute with each other.
 """
-from itertools import combinations
 from paulie.common.pauli_string_collection import PauliStringCollection
 
 def non_commuting_charges(generators: PauliStringCollection)->PauliStringCollection:
@@ -13,12 +12,10 @@ def non_commuting_charges(generators: PauliStringCollection)->PauliStringCollect
     inputs: generators as strings
     outputs: list of charges as strings
     """
-    non_q = PauliStringCollection()
-    comm = generators.get_commutants()
-    for c,q in combinations(comm,2):
-        if c | q is False:
-            if c not in non_q:
-                non_q.append(c)
-            if q not in non_q:
-                non_q.append(q)
-    return non_q
+    if len(generators) == 0:
+        return PauliStringCollection()
+    # A commutant anticommutes with some other commutant
+    # if and only if it anticommutes with an element of the basis of the commutant group
+    basis = generators.get_commutants(basis=True).get()
+    non_q = [c for c in generators.gen_commutants() if any(not c | q for q in basis)]
+    return PauliStringCollection(non_q).sort()
@@ -1,7 +1,6 @@
 """
     Computes the average graph complexity of a specified PauliString.
 """
-import networkx as nx
 from paulie.common.pauli_string_collection import PauliString, PauliStringCollection
 
 def average_graph_complexity(generators: PauliStringCollection, p: PauliString):
@@ -13,15 +12,9 @@ def average_graph_complexity(generators: PauliStringCollection, p: PauliString):
         generators: Generating set of the time evolution
         p: Pauli string to compute the average graph complexity of
     """
-    # Get commutator graph
-    vertices, edges = generators.get_commutator_graph()
-    # Construct graph in NetworkX
-    graph = nx.Graph()
-    graph.add_nodes_from(vertices)
-    graph.add_edges_from(edges)
-    # Get connected component containing p
-    subgraph = graph.subgraph(nx.node_connected_component(graph, str(p)))
-    # Return a dict of shortest path lengths to all nodes in connected component from p
-    spl = nx.shortest_path_length(subgraph, source=str(p))
+    # Get the implicit commutator graph, only the connected component of p is traversed
+    graph = generators.get_implicit_commutator_graph()
+    # Number of vertices at each shortest path length from p in its connected component
+    layer_sizes = graph.get_layer_sizes(p)
     # Sum the path lengths and divide by connected component size to obtain average graph complexity
-    return sum(spl.values()) / subgraph.number_of_nodes()
+    return sum(d * size for d, size in enumerate(layer_sizes)) / sum(layer_sizes)
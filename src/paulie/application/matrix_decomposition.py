@@ -1,25 +1,53 @@
 """
     Fast Pauli basis matrix decomposition algorithm.
 """
+from functools import lru_cache
 import numpy as np
+from paulie.common.pauli_string_bitarray import PauliString, get_basis_indices, get_signs
+from paulie.common.pauli_string_linear import PauliStringLinear, get_pauli_string_linear
+from paulie.common.pauli_string_packed import PauliStringPacked, get_packed_from_indices
 
-def _pauli_ord(row: np.ndarray, col: np.ndarray, n: int) -> None:
-    if n == 1:
-        row[0], col[0] = 0, 0
-        row[1], col[1] = 1, 1
-        row[2], col[2] = 0, 1
-        row[3], col[3] = 1, 0
-        return
-    _pauli_ord(row, col, n - 1)
-    pw = 1 << (2 * (n - 1))
-    row[pw: 2 * pw] = row[:pw] + (1 << (n - 1))
-    col[pw: 2 * pw] = col[:pw] + (1 << (n - 1))
-    row[2 * pw: 3 * pw] = row[:pw]
-    col[2 * pw: 3 * pw] = col[:pw] + (1 << (n - 1))
-    row[3 * pw: 4 * pw] = row[:pw] + (1 << (n - 1))
-    col[3 * pw: 4 * pw] = col[:pw]
-
-def _mat_to_vec(matrix: np.ndarray) -> np.ndarray:
+CACHE_SIZE = 16
+BLOCK_SIZE = 1 << 22
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _get_flat_index(n: int) -> np.ndarray:
+    """
+    Get the permutation of the flattened 2^n x 2^n matrix into Pauli order.
+    The base-4 digit d of position j of the Pauli order selects the row bit d & 1 and
+    the column bit (d >> 1) ^ (d & 1) at position j of the row and column indices,
+    the most significant digit selects the most significant bits.
+    The table is cached per number of qubits and is read-only.
+    """
+    k = np.arange(4 ** n, dtype=np.int64)
+    row = np.zeros(4 ** n, dtype=np.int64)
+    col = np.zeros(4 ** n, dtype=np.int64)
+    for j in range(n):
+        d = (k >> (2 * j)) & 3
+        row |= (d & 1) << j
+        col |= ((d >> 1) ^ (d & 1)) << j
+    flat_index = (row << n) | col
+    flat_index.setflags(write=False)
+    return flat_index
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _get_real_phases(n: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the real part and the opposite of the imaginary part of i^nY for every position
+    of the Pauli order, where nY is the number of base-4 digits 3 (the Paulis Y).
+    The tables are cached per number of qubits and are read-only.
+    """
+    count_y = np.zeros(1, dtype=np.int8)
+    for _ in range(n):
+        count_y = np.add.outer(count_y, np.array([0, 0, 0, 1], dtype=np.int8)).reshape(-1)
+    real = np.array([1, 0, -1, 0], dtype=np.int8)[count_y & 3]
+    imag = np.array([0, -1, 0, 1], dtype=np.int8)[count_y & 3]
+    real.setflags(write=False)
+    imag.setflags(write=False)
+    return real, imag
+
+def _mat_to_vec(matrix: np.ndarray, out: np.ndarray = None,
+                dtype: np.dtype = np.complex128) -> np.ndarray:
     """
     Vectorizes a matrix in Pauli order.
                                                           [vec(A)]
@@ -29,62 +57,327 @@ def _mat_to_vec(matrix: np.ndarray) -> np.ndarray:
 
     Args:
         matrix: The matrix to vectorize.
+        out: Optional buffer of size 4^n receiving the vector.
+        dtype: Data type of the vector.
+    """
+    log2n = int(matrix.shape[-1]).bit_length() - 1
+    flat_index = _get_flat_index(log2n)
+    flat = matrix.reshape(*matrix.shape[:-2], -1).astype(dtype, copy=False)
+    if out is None:
+        return flat[..., flat_index]
+    if out.shape != flat.shape or out.dtype != flat.dtype:
+        raise ValueError(f"out must be a {flat.dtype} array of shape {flat.shape}")
+    return np.take(flat, flat_index, axis=-1, out=out)
+
+def _butterfly(b: np.ndarray) -> np.ndarray:
     """
-    log2n = int(matrix.shape[0]).bit_length() - 1
-    row = np.zeros(4 ** log2n, dtype=np.int64)
-    col = np.zeros(4 ** log2n, dtype=np.int64)
-    _pauli_ord(row, col, log2n)
-    flat_index = (1 << log2n) * row + col
-    return matrix.reshape(-1)[flat_index].astype(np.complex128)
+    In place fast transform of the Pauli-ordered vectors along the last axis of b
+    """
+    size = b.shape[-1]
+    h = 1
+    while h < size:
+        # Every stage works on the whole buffer: block i of size 4h holds (x, y, z, w),
+        # which are replaced in place by (x + y, x - y, z + w, i(z - w)).
+        # The factors 1/2 of all stages are applied once at the end.
+        # A real buffer skips the factors i, which multiply the weights by i^nY.
+        v = b.reshape(*b.shape[:-1], -1, 4, h)
+        x, y, z, w = v[..., 0, :], v[..., 1, :], v[..., 2, :], v[..., 3, :]
+        x += y
+        y *= -2
+        y += x
+        z += w
+        w *= -2
+        w += z
+        if np.iscomplexobj(b):
+            w *= 1j
+        h *= 4
+    b *= 0.5 ** (size.bit_length() // 2)
+    return b
 
-def matrix_decomposition(matrix: np.ndarray) -> np.ndarray:
+def _butterfly_diagonal(b: np.ndarray) -> np.ndarray:
+    """
+    In place fast transform of the diagonals along the last axis of b
+    """
+    size = b.shape[-1]
+    h = 1
+    while h < size:
+        # In place stage on the whole buffer: (x, y) -> (x + y, x - y), scaled at the end
+        v = b.reshape(*b.shape[:-1], -1, 2, h)
+        x, y = v[..., 0, :], v[..., 1, :]
+        x += y
+        y *= -2
+        y += x
+        h *= 2
+    b *= 0.5 ** (size.bit_length() - 1)
+    return b
+
+def matrix_decomposition(matrix: np.ndarray, out: np.ndarray = None,
+                         dtype: np.dtype = np.complex128) -> np.ndarray:
     """
     Return the weight vector corresponding to the Pauli basis decomposition of a matrix.
 
     Args:
-        matrix: The matrix to be decomposed.
+        matrix: The matrix to be decomposed, or a stack of shape (batch, 2^n, 2^n)
+                of matrices decomposed together.
+        out: Optional buffer of shape (4^n,) (or (batch, 4^n)) of type dtype receiving
+             the weights, reusing it avoids the allocation in repeated decompositions.
+        dtype: Precision of the computation, np.complex128 or np.complex64.
+               A real type (np.float64 or np.float32) computes the real part of the weights
+               in real arithmetic, which are the weights of a Hermitian matrix.
+    Returns the weights of shape (4^n,), or (batch, 4^n) for a stack of matrices.
     """
-    if matrix.ndim != 2:
-        raise ValueError("matrix must be a 2D ndarray")
-    if matrix.shape[0] != matrix.shape[1]:
+    if matrix.ndim not in (2, 3):
+        raise ValueError("matrix must be a 2D ndarray or a 3D stack of matrices")
+    if matrix.shape[-2] != matrix.shape[-1]:
         raise ValueError(f"expected square matrix but matrix dimensions \
-                         are ({matrix.shape[0]}, {matrix.shape[1]})")
-    if matrix.shape[0] == 1:
+                         are ({matrix.shape[-2]}, {matrix.shape[-1]})")
+    if matrix.shape[-1] == 1:
         raise ValueError("input must be a matrix, not a scalar")
-    if int(matrix.shape[0]).bit_count() != 1:
+    if int(matrix.shape[-1]).bit_count() != 1:
+        raise ValueError(f"expected square matrix with power of two \
+                         dimensions but matrix dimensions are \
+                         ({matrix.shape[-2]}, {matrix.shape[-1]})")
+    if np.dtype(dtype).kind == "c":
+        return _butterfly(_mat_to_vec(matrix, out, dtype))
+    # For M = A + iB with real A and B, the weights are i^nY (T(A) + i T(B)),
+    # where T is the transform without the factors i
+    real, imag = _get_real_phases(int(matrix.shape[-1]).bit_length() - 1)
+    weights = _butterfly(_mat_to_vec(matrix.real, out, dtype))
+    weights *= real
+    if np.iscomplexobj(matrix):
+        weights_imag = _butterfly(_mat_to_vec(matrix.imag, None, dtype))
+        weights_imag *= imag
+        weights += weights_imag
+    return weights
+
+def matrix_decomposition_memmap(matrix: np.ndarray | str, out: np.ndarray | str,
+                                block_size: int = BLOCK_SIZE) -> np.memmap:
+    """
+    Out-of-core Pauli basis decomposition of a matrix that does not fit in memory.
+    The Pauli order index splits into h high and l = n - h low base-4 digits. The low digits
+    of all weights sharing the high digits come from one 2^l x 2^l sub-block of the matrix,
+    so the first pass transforms groups of sub-blocks of a band of rows at a time. The second
+    pass transforms the high digits on bands of columns of the output viewed as a (4^h, 4^l)
+    matrix. Only one group or band is resident at a time, that is about
+    max(block_size, 4^l, 4^h) entries with 4^l and 4^h of the order of 2^n.
+
+    Args:
+        matrix: The matrix to be decomposed, usually a np.memmap,
+                or the path of a .npy file opened as a memory map.
+        out: Complex128 array of length 4^n receiving the weights, usually a np.memmap,
+             or the path of a .npy file created as a memory map.
+        block_size: Number of entries of the matrix or of the output read or written
+                    at a time, rounded down to whole sub-blocks or columns and to at least one.
+    Returns the weights vector out.
+    """
+    if isinstance(matrix, str):
+        matrix = np.load(matrix, mmap_mode="r")
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError("matrix must be a square 2D ndarray")
+    if matrix.shape[0] == 1 or int(matrix.shape[0]).bit_count() != 1:
         raise ValueError(f"expected square matrix with power of two \
                          dimensions but matrix dimensions are \
                          ({matrix.shape[0]}, {matrix.shape[1]})")
-    b = _mat_to_vec(matrix)
-    h = 1
-    while h < b.shape[0]:
-        for i in range(0, b.shape[0], 4 * h):
-            x, y = b[i : i + h], b[i + h : i + 2 * h]
-            b[i : i + h], b[i + h : i + 2 * h] = (x + y) / 2, (x - y) / 2
-            z, w = b[i + 2 * h : i + 3 * h], b[i + 3 * h : i + 4 * h]
-            b[i + 2 * h : i + 3 * h], b[i + 3 * h : i + 4 * h] = (z + w) / 2, 1j * (z - w) / 2
-        h *= 4
-    return b
+    n = int(matrix.shape[0]).bit_length() - 1
+    if isinstance(out, str):
+        out = np.lib.format.open_memmap(out, mode="w+", dtype=np.complex128, shape=(4 ** n,))
+    if out.shape != (4 ** n,) or out.dtype != np.complex128:
+        raise ValueError(f"out must be a complex128 vector of length {4 ** n}")
+    low = (n + 1) // 2
+    high = n - low
+    weights = out.reshape(4 ** high, 4 ** low)
+    # Position of the high digits of the weights of the sub-block (row, col)
+    positions = np.argsort(_get_flat_index(high)).reshape(1 << high, 1 << high)
+    count = max(1, block_size // 4 ** low)
+    for row in range(1 << high):
+        for col in range(0, 1 << high, count):
+            cols = min(count, (1 << high) - col)
+            band = np.asarray(matrix[row << low:(row + 1) << low,
+                                     col << low:(col + cols) << low])
+            blocks = band.reshape(1 << low, cols, 1 << low).transpose(1, 0, 2)
+            weights[positions[row, col:col + cols]] = _butterfly(_mat_to_vec(blocks))
+    step = max(1, block_size // 4 ** high)
+    for start in range(0, 4 ** low, step):
+        band = np.ascontiguousarray(weights[:, start:start + step].T)
+        weights[:, start:start + step] = _butterfly(band).T
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
 
-def matrix_decomposition_diagonal(diag: np.ndarray) -> np.ndarray:
+def matrix_decomposition_diagonal(diag: np.ndarray,
+                                  dtype: np.dtype = np.complex128) -> np.ndarray:
     """
     Return the weight vector corresponding to the Pauli basis decomposition of a diagonal matrix.
 
     Args:
-        diag: The main diagonal of the diagonal matrix to be decomposed.
+        diag: The main diagonal of the diagonal matrix to be decomposed,
+              or a stack of shape (batch, 2^n) of diagonals decomposed together.
+        dtype: Precision of the computation, np.complex128 or np.complex64.
+               A real type (np.float64 or np.float32) computes the real part of the weights,
+               which are the weights of a Hermitian matrix.
+    Returns the weights of shape (2^n,), or (batch, 2^n) for a stack of diagonals.
     """
-    if diag.ndim != 1:
-        raise ValueError("matrix must be a 1D ndarray")
-    if diag.shape[0] == 1:
+    if diag.ndim not in (1, 2):
+        raise ValueError("matrix must be a 1D ndarray or a 2D stack of diagonals")
+    if diag.shape[-1] == 1:
         raise ValueError("input cannot be scalar")
-    if int(diag.shape[0]).bit_count() != 1:
+    if int(diag.shape[-1]).bit_count() != 1:
         raise ValueError(f"expected 1D ndarray with power of two \
-                         length but length is {diag.shape[0]}")
-    b = diag.astype(np.complex128)
+                         length but length is {diag.shape[-1]}")
+    if np.dtype(dtype).kind != "c":
+        diag = diag.real
+    return _butterfly_diagonal(diag.astype(dtype))
+
+def _inverse_butterfly(b: np.ndarray) -> np.ndarray:
+    """
+    In place inverse of _butterfly along the last axis of b
+    """
+    size = b.shape[-1]
     h = 1
-    while h < b.shape[0]:
-        for i in range(0, b.shape[0], 2 * h):
-            x, y = b[i : i + h], b[i + h : i + 2 * h]
-            b[i : i + h], b[i + h : i + 2 * h] = (x + y) / 2, (x - y) / 2
+    while h < size:
+        # Inverse stage: (a, b, c, d) -> (a + b, a - b, c - i d, c + i d).
+        # The stages act on distinct base-4 digits and commute.
+        v = b.reshape(*b.shape[:-1], -1, 4, h)
+        x, y, z, w = v[..., 0, :], v[..., 1, :], v[..., 2, :], v[..., 3, :]
+        x += y
+        y *= -2
+        y += x
+        w *= 1j
+        z -= w
+        w *= 2
+        w += z
+        h *= 4
+    return b
+
+def _inverse_butterfly_diagonal(b: np.ndarray) -> np.ndarray:
+    """
+    In place inverse of _butterfly_diagonal along the last axis of b
+    """
+    size = b.shape[-1]
+    h = 1
+    while h < size:
+        v = b.reshape(*b.shape[:-1], -1, 2, h)
+        x, y = v[..., 0, :], v[..., 1, :]
+        x += y
+        y *= -2
+        y += x
         h *= 2
     return b
+
+def inverse_matrix_decomposition(weights: np.ndarray) -> np.ndarray:
+    """
+    Return the matrix with the given weight vector of the Pauli basis decomposition,
+    the inverse of matrix_decomposition.
+
+    Args:
+        weights: Weight vector of length 4^n, or a stack of shape (batch, 4^n).
+    Returns the matrix of shape (2^n, 2^n), or (batch, 2^n, 2^n) for a stack of weights.
+    """
+    if weights.ndim not in (1, 2):
+        raise ValueError("weights must be a 1D ndarray or a 2D stack of weight vectors")
+    size = int(weights.shape[-1])
+    if size == 1 or size.bit_count() != 1 or size.bit_length() % 2 == 0:
+        raise ValueError(f"expected weight vector with power of four \
+                         length but length is {size}")
+    log2n = size.bit_length() // 2
+    b = _inverse_butterfly(weights.astype(np.complex128))
+    matrix = np.empty(b.shape, dtype=np.complex128)
+    matrix[..., _get_flat_index(log2n)] = b
+    return matrix.reshape(*b.shape[:-1], 1 << log2n, 1 << log2n)
+
+def inverse_matrix_decomposition_diagonal(weights: np.ndarray) -> np.ndarray:
+    """
+    Return the main diagonal of the diagonal matrix with the given weight vector,
+    the inverse of matrix_decomposition_diagonal.
+
+    Args:
+        weights: Weight vector of length 2^n, or a stack of shape (batch, 2^n).
+    Returns the diagonal of shape (2^n,), or (batch, 2^n) for a stack of weights.
+    """
+    if weights.ndim not in (1, 2):
+        raise ValueError("weights must be a 1D ndarray or a 2D stack of weight vectors")
+    if weights.shape[-1] == 1 or int(weights.shape[-1]).bit_count() != 1:
+        raise ValueError(f"expected weight vector with power of two \
+                         length but length is {weights.shape[-1]}")
+    return _inverse_butterfly_diagonal(weights.astype(np.complex128))
+
+def get_significant_indices(weights: np.ndarray, tol: float = 1e-12,
+                            top_k: int = None) -> np.ndarray:
+    """
+    Return the indices of the significant entries of a weight vector,
+    sorted by decreasing magnitude.
+
+    Args:
+        weights: Weight vector of the Pauli basis decomposition.
+        tol: Only the weights of magnitude above tol are kept.
+        top_k: If specified, then at most the top_k weights of largest magnitude are kept.
+    """
+    magnitudes = np.abs(weights)
+    indices = np.flatnonzero(magnitudes > tol)
+    if top_k is not None and top_k < len(indices):
+        indices = indices[np.argpartition(magnitudes[indices], -top_k)[-top_k:]]
+    return indices[np.argsort(-magnitudes[indices], kind="stable")]
+
+def pauli_decomposition(matrix: np.ndarray, tol: float = 1e-12, top_k: int = None,
+                        packed: bool = False
+                        ) -> PauliStringLinear | tuple[PauliStringPacked, np.ndarray]:
+    """
+    Return the significant terms of the Pauli basis decomposition of a matrix.
+    The indices of the weights are converted to Pauli strings in bulk.
+
+    Args:
+        matrix: The matrix to be decomposed.
+        tol: Only the weights of magnitude above tol are kept.
+        top_k: If specified, then at most the top_k weights of largest magnitude are kept.
+        packed: If True, then the packed Pauli strings and their weights are returned
+                instead of a linear combination.
+    Returns the linear combination of the significant Pauli strings,
+    with the terms sorted by decreasing magnitude of their weights.
+    """
+    if matrix.ndim != 2:
+        raise ValueError("matrix must be a 2D ndarray")
+    weights = matrix_decomposition(matrix)
+    n = int(matrix.shape[0]).bit_length() - 1
+    indices = get_significant_indices(weights, tol, top_k)
+    pauli_strings = get_packed_from_indices(indices, n)
+    if packed:
+        return pauli_strings, weights[indices]
+    return get_pauli_string_linear(pauli_strings, weights[indices])
+
+def pauli_coefficients(matrix: np.ndarray, pauli_strings: list[PauliString | str]) -> np.ndarray:
+    """
+    Return the weights Tr(P M) / 2^n of selected Pauli strings P in the Pauli basis
+    decomposition of a matrix M, without the full decomposition.
+    Since P[b ^ x, b] = i^nY (-1)^popcount(b & z), Tr(P M) = i^nY sum_b (-1)^popcount(b & z)
+    M[b, b ^ x]. The Pauli strings are grouped by X-part, so every group gathers one
+    off-diagonal of M. A group with many Z-parts is transformed at once
+    with matrix_decomposition_diagonal.
+
+    Args:
+        matrix: The matrix to be decomposed.
+        pauli_strings: Pauli strings whose weights are computed.
+    Returns the vector of weights in the order of pauli_strings.
+    """
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError("matrix must be a square 2D ndarray")
+    n = int(matrix.shape[0]).bit_length() - 1
+    groups = {}
+    for i, pauli in enumerate(pauli_strings):
+        if not isinstance(pauli, PauliString):
+            pauli = PauliString(pauli_str=str(pauli))
+        if len(pauli) != n:
+            raise ValueError(f"expected Pauli strings of length {n}")
+        x, z = pauli.get_masks()
+        groups.setdefault(x, []).append((i, z, pauli.get_phase()))
+    rows = get_basis_indices(n)
+    weights = np.zeros(len(pauli_strings), dtype=np.complex128)
+    for x, terms in groups.items():
+        off_diagonal = matrix[rows, rows ^ np.uint64(x)]
+        if len(terms) > n:
+            transform = matrix_decomposition_diagonal(off_diagonal) if n > 0 else off_diagonal
+            for i, z, phase in terms:
+                weights[i] = phase * transform[z]
+        else:
+            for i, z, phase in terms:
+                weights[i] = phase * np.dot(get_signs(rows, z), off_diagonal) / (1 << n)
+    return weights
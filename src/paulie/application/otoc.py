@@ -1,9 +1,93 @@
 """
     Compute the average out-of-time-order correlator between two Pauli strings.
 """
-from collections import deque
+import numpy as np
+from paulie.common.commutator_graph import CommutatorGraph
 from paulie.common.pauli_string_collection import PauliStringCollection
 from paulie.common.pauli_string_bitarray import PauliString
+from paulie.common.pauli_string_packed import (
+    PauliStringPacked,
+    get_packed,
+    get_packed_from_indices,
+)
+
+
+class OtocEngine:
+    """
+    Average out-of-time-order correlators for a fixed generating set.
+    The connected components of the commutator graph are discovered once and cached
+    together with a map from their vertices to the component, so that the correlators of
+    many pairs (V, W) only count the anticommuting strings of an already known component.
+    """
+
+    def __init__(self, generators: PauliStringCollection) -> None:
+        """
+        Initialize the engine
+
+        Args:
+            generators: Generating set of the Pauli string DLA.
+        """
+        self.graph = CommutatorGraph(generators)
+        # Map from the vertex keys to the number of their component
+        self.component_of = {}
+        # Packed Pauli strings of the discovered components
+        self.components = []
+
+    def get_component(self, v: PauliString) -> PauliStringPacked:
+        """
+        Get the connected component of V in the commutator graph as a packed batch,
+        discovering and caching it on the first request
+        """
+        key = self.graph.get_key(v)
+        index = self.component_of.get(key)
+        if index is not None:
+            return self.components[index]
+        n = self.graph.get_size()
+        if self.graph.is_vectorized():
+            keys = self.graph.get_component_array(v)
+            component = get_packed_from_indices(keys, n)
+            keys = keys.tolist()
+        else:
+            keys = self.graph.get_component_keys(v)
+            component = get_packed([self.graph.get_pauli_string(k) for k in keys], n)
+        index = len(self.components)
+        self.components.append(component)
+        self.component_of.update(dict.fromkeys(keys, index))
+        return component
+
+    def get_component_size(self, v: PauliString) -> int:
+        """
+        Get the size of the connected component of V in the commutator graph
+        """
+        return len(self.get_component(v))
+
+    def average_otocs(self, v: PauliString, ws: list[PauliString]) -> np.ndarray:
+        """
+        Computes the Haar averaged out-of-time-order correlators between V and several
+        Pauli strings W at once, see average_otoc
+
+        Args:
+            v: Pauli string V
+            ws: Pauli strings W
+        Returns the vector of the correlators
+        """
+        component = self.get_component(v)
+        packed_ws = get_packed(list(ws), self.graph.get_size())
+        # Number of elements in connected component of V that anti-commute with each W
+        anti_commute_counts = component.get_anticommutation_matrix(packed_ws).sum(axis=0)
+        return 1 - 2 * anti_commute_counts / len(component)
+
+    def average_otoc(self, v: PauliString, w: PauliString) -> float:
+        """
+        Computes the Haar averaged out-of-time-order correlator between V and W,
+        see the function average_otoc
+
+        Args:
+            v: Pauli string V
+            w: Pauli string W
+        """
+        return float(self.average_otocs(v, [w])[0])
+
 
 def average_otoc(generators: PauliStringCollection,
                  v: PauliString, w: PauliString) -> float:
@@ -17,27 +101,11 @@ def average_otoc(generators: PauliStringCollection,
     1 - 2 * |{W, P} = 0 : P in connected component of V| / |connected component of V|.
     (arXiV:2502.16404)
 
+    For many pairs (V, W) with the same generators, reuse an OtocEngine instead.
+
     Args:
         generators: Generating set of the Pauli string DLA.
         v: Pauli string V
         w: Pauli string W
     """
-    # Number of elements in connected component of V that anti-commute with W
-    anti_commute_count = 0
-    # Run BFS algorithm to discover connected component of V
-    v_connected_component_size = 0
-    visited = set()
-    queue = deque([v])
-    while queue:
-        t = queue.popleft()
-        if t in visited:
-            continue
-        visited.add(t)
-        if not w | t:
-            anti_commute_count += 1
-        v_connected_component_size += 1
-        for g in generators:
-            comm = t ^ g
-            if comm and comm not in visited:
-                queue.append(comm)
-    return 1 - 2 * anti_commute_count / v_connected_component_size
+    return OtocEngine(generators).average_otoc(v, w)
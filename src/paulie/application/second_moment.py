@@ -4,7 +4,7 @@ over a group generated by system generators, based on the theory
 in arXiv:2502.16404.
 """
 from paulie.common.pauli_string_collection import PauliStringCollection
-from paulie.common.pauli_string_linear import PauliStringLinear
+from paulie.common.pauli_string_linear import TOLERANCE, PauliStringLinear
 
 def second_moment(
     operator_m: PauliStringLinear, system_generators: PauliStringCollection
@@ -24,11 +24,10 @@ def second_moment(
         coeff = (q_norm.h @ operator_m).trace()
 
         # If the projection is negligible, skip
-        if abs(coeff) < 1e-12:
+        if abs(coeff) < TOLERANCE:
             continue
 
-        # Step 3: Add the scaled basis vector to the result
-        projection = q_norm * coeff
-        twirl_result += projection
+        # Step 3: Accumulate the scaled basis vector into the result in place
+        twirl_result.axpy(coeff, q_norm)
 
     return twirl_result.simplify()
@@ -0,0 +1,74 @@
+"""
+    Pauli expectation spectrum and stabilizer Rényi entropy of a pure state,
+    computed from the state vector without forming the density matrix.
+"""
+import numpy as np
+from paulie.application.matrix_decomposition import matrix_decomposition_diagonal
+
+BLOCK_SIZE = 1 << 22
+
+def _spread_bits(n: int) -> np.ndarray:
+    """
+    Spread the n bits of every integer below 2^n to the even bit positions
+    """
+    values = np.arange(1 << n, dtype=np.int64)
+    spread = np.zeros(1 << n, dtype=np.int64)
+    for j in range(n):
+        spread |= ((values >> j) & 1) << (2 * j)
+    return spread
+
+def pauli_expectations(state: np.ndarray, block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """
+    Return the expectation values <psi|P|psi> of all Pauli strings P for a pure state.
+    Since P|b> = i^nY (-1)^popcount(b & z) |b ^ x>, for a fixed X-part x the expectations of
+    all Z-parts z are the Walsh-Hadamard transform of the pairwise products
+    conj(psi[b ^ x]) psi[b], computed with matrix_decomposition_diagonal on blocks of X-parts.
+
+    Args:
+        state: State vector of length 2^n.
+        block_size: Number of pairwise products transformed at a time.
+    Returns the real vector of length 4^n in the order of matrix_decomposition
+    (see PauliString.get_index).
+    """
+    if state.ndim != 1:
+        raise ValueError("state must be a 1D ndarray")
+    if state.shape[0] == 1 or int(state.shape[0]).bit_count() != 1:
+        raise ValueError(f"expected state vector with power of two \
+                         length but length is {state.shape[0]}")
+    n = int(state.shape[0]).bit_length() - 1
+    size = 1 << n
+    state = state.astype(np.complex128)
+    indices = np.arange(size, dtype=np.int64)
+    spread = _spread_bits(n)
+    powers = np.array([1, 1j, -1, -1j])
+    expectations = np.empty(4 ** n)
+    step = max(1, block_size // size)
+    for start in range(0, size, step):
+        x = indices[start:start + step, None]
+        products = np.conj(state[indices[None, :] ^ x]) * state[None, :]
+        transform = matrix_decomposition_diagonal(products) * size
+        # The phase i^nY with nY = popcount(x & z), the expectations are real
+        phases = powers[np.bitwise_count(x & indices[None, :]) & 3]
+        expectations[(spread[x] << 1) | spread[None, :]] = (phases * transform).real
+    return expectations
+
+def stabilizer_renyi_entropy(state: np.ndarray, alpha: float = 2,
+                             expectations: np.ndarray = None) -> float:
+    """
+    Return the stabilizer Rényi entropy of a pure state
+    M_alpha = log2(sum_P Xi_P^alpha) / (1 - alpha) - n with Xi_P = <psi|P|psi>^2 / 2^n.
+    For alpha = 1 the Shannon entropy of Xi minus n is returned.
+
+    Args:
+        state: Normalized state vector of length 2^n.
+        alpha: Order of the entropy.
+        expectations: Expectation values of pauli_expectations, computed if not specified.
+    """
+    if expectations is None:
+        expectations = pauli_expectations(state)
+    n = (expectations.shape[0].bit_length() - 1) // 2
+    xi = expectations ** 2 / (1 << n)
+    if alpha == 1:
+        non_zero = xi[xi > 1e-15]
+        return -np.sum(non_zero * np.log2(non_zero)) - n
+    return np.log2(np.sum(xi ** alpha)) / (1 - alpha) - n
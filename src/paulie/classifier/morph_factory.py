@@ -3,9 +3,11 @@ Factory for constructing a canonical graph
 """
 import traceback
 from typing import Generator, Self
+import numpy as np
 from paulie.helpers.printing import Debug
 from paulie.classifier.classification import Morph
 from paulie.common.pauli_string_bitarray import PauliString
+from paulie.common.pauli_string_packed import get_packed
 
 class AppendedException(Exception):
     """
@@ -843,43 +845,67 @@ class MorphFactory(Debug):
         """
         return self.debug_break
 
-    def _get_anti_commutates(self, pauli_string:PauliString,
-                             generators) -> list[PauliString]:
+    def _get_anti_commutates_map(self, generators:list[PauliString]
+    ) -> tuple[dict[PauliString, set[PauliString]], np.ndarray]:
+        """
+            Build the sets of non-commuting Pauli strings of every generator at once.
+            Only the pairs with overlapping supports are checked.
+            Returns the map from every generator to the set of its non-commuting
+            Pauli strings and the number of non-commuting Pauli strings of every generator
+        """
+        anti_commutates_map = {g: set() for g in generators}
+        pairs = get_packed(list(generators)).get_anticommuting_pairs()
+        for i, j in pairs.tolist():
+            anti_commutates_map[generators[i]].add(generators[j])
+            anti_commutates_map[generators[j]].add(generators[i])
+        return anti_commutates_map, np.bincount(pairs.reshape(-1), minlength=len(generators))
+
+    def _get_anti_commutates(self, pauli_string:PauliString, generators,
+                             anti_commutates_map:dict[PauliString, set[PauliString]] = None
+                             ) -> list[PauliString]:
         """
             Get a collection of non-commuting Pauli strings
             Args:
                 Pauli string to which commutators are defined
             generators: The area of Pauli strings over which to build a graph.
             If not specified, then collection
+            anti_commutates_map: Sets of non-commuting Pauli strings built by
+            _get_anti_commutates_map over a superset of generators.
+            If not specified, then the commutators are checked one by one
         """
+        if anti_commutates_map is not None and pauli_string in anti_commutates_map:
+            anti_commutates = anti_commutates_map[pauli_string]
+            return [g for g in generators if g in anti_commutates]
         return [g for g in generators
                if g != pauli_string and not pauli_string|g]
 
 
-    def _get_max_connected(self, generators:list[PauliString]
+    def _get_max_connected(self, generators:list[PauliString],
+                           anti_commutates_map:dict[PauliString, set[PauliString]] = None,
+                           counts:np.ndarray = None
     ) -> tuple[PauliString|None, list[PauliString]|None]:
         """Get the Pauli string that has the maximum number of non-commutable"""
         if len(generators) == 0:
             return None, None
-        pauli_string = generators[0]
-        anti_commutates = self._get_anti_commutates(pauli_string, generators)
-        for p in generators:
-            _anti_commutates = self._get_anti_commutates(p, generators)
-            if len(_anti_commutates) > len(anti_commutates):
-                pauli_string = p
-                anti_commutates = _anti_commutates
-        return pauli_string, anti_commutates
+        if anti_commutates_map is None or counts is None:
+            anti_commutates_map, counts = self._get_anti_commutates_map(generators)
+        pauli_string = generators[int(np.argmax(counts))]
+        return pauli_string, self._get_anti_commutates(pauli_string, generators,
+                                                       anti_commutates_map)
 
 
 
     def _append_to_queue(self, queue_pauli_strings:list[PauliString],
-                         pauli_strings:list[PauliString]) -> None:
+                         pauli_strings:list[PauliString],
+                         anti_commutates_map:dict[PauliString, set[PauliString]] = None
+                         ) -> None:
         """Append the next related Pauli string to the queue"""
         for p in pauli_strings:
             if p in queue_pauli_strings:
                 pauli_strings.remove(p)
                 continue
-            anti_commutates = self._get_anti_commutates(p, queue_pauli_strings)
+            anti_commutates = self._get_anti_commutates(p, queue_pauli_strings,
+                                                        anti_commutates_map)
             if len(anti_commutates) == 0:
                 continue
             if len(anti_commutates) > 1:
@@ -899,7 +925,9 @@ class MorphFactory(Debug):
         new_generators = generators.copy()
         new_generators.sort()
         queue_pauli_strings = []
-        pauli_string, anti_commutates = self._get_max_connected(new_generators)
+        anti_commutates_map, counts = self._get_anti_commutates_map(new_generators)
+        pauli_string, anti_commutates = self._get_max_connected(new_generators,
+                                                                anti_commutates_map, counts)
 
         new_generators.remove(pauli_string)
         queue_pauli_strings.append(pauli_string)
@@ -909,7 +937,7 @@ class MorphFactory(Debug):
                 queue_pauli_strings.append(anti_commutate)
 
         while len(new_generators) > 0:
-            self._append_to_queue(queue_pauli_strings, new_generators)
+            self._append_to_queue(queue_pauli_strings, new_generators, anti_commutates_map)
         return queue_pauli_strings
 
     def build(self, generators:list[PauliString]) -> Self:
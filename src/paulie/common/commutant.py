@@ -0,0 +1,103 @@
+"""
+Commutant of a set of Pauli strings by linear algebra over GF(2).
+Up to phases, the Pauli strings commuting with a set of generators form the symplectic
+complement of the subspace spanned by the generators, which is the null space of a binary
+matrix and is found by Gaussian elimination on bit-packed rows in polynomial time.
+"""
+from typing import Generator
+from bitarray.util import int2ba
+from paulie.common.pauli_string_bitarray import PauliString
+
+
+def _get_z_mask(n: int) -> int:
+    """
+    Mask of the Z-bits in the index of a Pauli string of length n
+    """
+    return int("01" * n, 2) if n > 0 else 0
+
+
+def _swap_xz(key: int, z_mask: int) -> int:
+    """
+    Exchange the X-bits and Z-bits of a Pauli string index, so that the symplectic product
+    of a and b is the parity of the bitwise AND of _swap_xz(a) and b
+    """
+    return ((key >> 1) & z_mask) | ((key & z_mask) << 1)
+
+
+def get_null_space(rows: list[int], m: int) -> list[int]:
+    """
+    Get a basis of the null space of a binary matrix over GF(2)
+    Args:
+        rows: Rows of the matrix, bit j of a row is the entry of column j
+        m: Number of columns
+    Returns the basis vectors of {v : parity(row & v) = 0 for every row}
+    """
+    pivots = {}
+    for row in rows:
+        for bit, pivot_row in pivots.items():
+            if (row >> bit) & 1:
+                row ^= pivot_row
+        if row == 0:
+            continue
+        bit = row.bit_length() - 1
+        for pivot_bit, pivot_row in pivots.items():
+            if (pivot_row >> bit) & 1:
+                pivots[pivot_bit] = pivot_row ^ row
+        pivots[bit] = row
+    basis = []
+    for free in range(m):
+        if free in pivots:
+            continue
+        v = 1 << free
+        for bit, pivot_row in pivots.items():
+            if (pivot_row >> free) & 1:
+                v |= 1 << bit
+        basis.append(v)
+    return basis
+
+
+def get_commutant_basis_indices(generators: list[PauliString], n: int) -> list[int]:
+    """
+    Get the indices (see PauliString.get_index) of a basis of the commutant of a set of
+    Pauli strings, the group of Pauli strings that commute with every generator, up to phases
+    Args:
+        generators: Set of Pauli strings
+        n: Length of the Pauli strings
+    """
+    z_mask = _get_z_mask(n)
+    rows = [_swap_xz(g.get_index(), z_mask) for g in generators]
+    return get_null_space(rows, 2 * n)
+
+
+def gen_group_indices(basis: list[int]) -> Generator[int, None, None]:
+    """
+    Lazily enumerate the indices of the group generated by a basis in Gray code order,
+    every element is obtained from the previous one by a single product
+    """
+    key = 0
+    yield key
+    for i in range(1, 1 << len(basis)):
+        key ^= basis[(i & -i).bit_length() - 1]
+        yield key
+
+
+def get_commutant_basis(generators: list[PauliString], n: int) -> list[PauliString]:
+    """
+    Get a basis of the commutant of a set of Pauli strings
+    Args:
+        generators: Set of Pauli strings
+        n: Length of the Pauli strings
+    """
+    return [PauliString(bits=int2ba(key, length=2 * n))
+            for key in get_commutant_basis_indices(generators, n)]
+
+
+def gen_commutants(generators: list[PauliString], n: int) -> Generator[PauliString, None, None]:
+    """
+    Lazily enumerate the Pauli strings that commute with every generator
+    Args:
+        generators: Set of Pauli strings
+        n: Length of the Pauli strings
+    """
+    for key in gen_group_indices(get_commutant_basis_indices(generators, n)):
+        yield PauliString(bits=int2ba(key, length=2 * n))
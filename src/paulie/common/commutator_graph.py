@@ -0,0 +1,346 @@
+"""
+Implicit commutator graph.
+The vertices are all Pauli strings of a given length and the neighbours of a vertex P are
+{G P : G in generators, G anticommutes with P}. The neighbours are computed on the fly,
+so the 4^n vertices are never enumerated unless the whole graph is requested.
+Up to 32 qubits the vertex keys fit in uint64 words and the breadth-first search
+expands a whole frontier at once with vectorized anticommutation masks.
+Up to 12 qubits the partition of all 4^n vertices into connected components is computed
+by label propagation over the integer index space.
+"""
+from typing import Generator
+import numpy as np
+from bitarray.util import int2ba
+from paulie.common.pauli_string_bitarray import PauliString
+from paulie.common.pauli_string_packed import BLOCK_SIZE, WORD_SIZE, get_packed_from_indices
+
+# Maximal length of the Pauli strings for which the whole graph is labelled in index space
+DENSE_SIZE = 12
+
+
+def _get_sorted_unique(keys: np.ndarray) -> np.ndarray:
+    """
+    Sort an array of vertex keys and remove the repetitions
+    """
+    keys = np.sort(keys)
+    if len(keys) == 0:
+        return keys
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+
+def _get_sorted_difference(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Remove from a sorted array of distinct vertex keys the keys of another sorted array
+    """
+    if len(b) == 0 or len(a) == 0:
+        return a
+    positions = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[positions] != a]
+
+
+class CommutatorGraphException(Exception):
+    """
+    Exception for the commutator graph
+    """
+
+
+class CommutatorGraph:
+    """
+    Implicit commutator graph of a set of generators.
+    Vertices are represented internally by their index in the matrix decomposition
+    vector (see PauliString.get_index), so that the product of two Pauli strings
+    is the XOR of their indices.
+    """
+
+    def __init__(self, generators: list[PauliString], vectorized: bool = True) -> None:
+        """
+        Initialize the commutator graph
+
+        Args:
+            generators: Generating set of the Pauli string DLA
+            vectorized: If False, then the breadth-first search expands one vertex at a time
+                        even when the vertex keys fit in uint64 words
+        """
+        generators = list(generators)
+        self.n = len(generators[0]) if len(generators) > 0 else 0
+        if any(len(g) != self.n for g in generators):
+            raise CommutatorGraphException("Generators must have the same length")
+        self.generators = list(dict.fromkeys(g.get_index() for g in generators
+                                             if not g.is_identity()))
+        self.z_mask = int("01" * self.n, 2) if self.n > 0 else 0
+        # Generators with exchanged X-bits and Z-bits, the vertex a anticommutes with
+        # the generator g iff the parity of a & swapped(g) is odd
+        self.swapped_generators = None
+        if vectorized and self.n <= WORD_SIZE // 2:
+            self.swapped_generators = np.array(
+                [((g >> 1) & self.z_mask) | ((g & self.z_mask) << 1) for g in self.generators],
+                dtype=np.uint64)
+
+    def get_size(self) -> int:
+        """
+        Get the length of the Pauli strings of the graph
+        """
+        return self.n
+
+    def get_key(self, p: PauliString) -> int:
+        """
+        Get the vertex key of a Pauli string
+        """
+        if len(p) != self.n:
+            raise CommutatorGraphException(f"Expected a Pauli string of length {self.n}")
+        return p.get_index()
+
+    def get_pauli_string(self, key: int) -> PauliString:
+        """
+        Get the Pauli string of a vertex key
+        """
+        return PauliString(bits=int2ba(key, length=2 * self.n))
+
+    def anticommutes(self, a: int, b: int) -> bool:
+        """
+        Check if the Pauli strings with vertex keys a and b anticommute
+        """
+        return ((((a >> 1) & b) ^ ((b >> 1) & a)) & self.z_mask).bit_count() & 1 == 1
+
+    def gen_neighbour_keys(self, key: int) -> Generator[int, None, None]:
+        """
+        Generate the vertex keys of the neighbours of a vertex
+        """
+        for g in self.generators:
+            if self.anticommutes(key, g):
+                yield key ^ g
+
+    def get_neighbours(self, p: PauliString) -> list[PauliString]:
+        """
+        Get the neighbours of a Pauli string in the commutator graph
+        """
+        return [self.get_pauli_string(k) for k in self.gen_neighbour_keys(self.get_key(p))]
+
+    def is_vectorized(self) -> bool:
+        """
+        Check if the vertex keys fit in uint64 words, so that the frontiers are vectorized
+        """
+        return self.swapped_generators is not None
+
+    def get_neighbour_array(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Get the vertex keys of the neighbours of a whole frontier, with repetitions
+        Args:
+            keys: uint64 array of vertex keys
+        Returns a uint64 array of vertex keys
+        """
+        if not self.is_vectorized():
+            raise CommutatorGraphException(f"Vertex arrays are supported up to "
+                                           f"{WORD_SIZE // 2} qubits")
+        generators = np.array(self.generators, dtype=np.uint64)
+        step = max(1, BLOCK_SIZE // max(1, len(generators)))
+        neighbours = []
+        for start in range(0, len(keys), step):
+            block = keys[start:start + step, None]
+            mask = (np.bitwise_count(block & self.swapped_generators[None]) & 1).astype(bool)
+            neighbours.append((block ^ generators[None])[mask])
+        if not neighbours:
+            return np.empty(0, dtype=np.uint64)
+        return np.concatenate(neighbours)
+
+    def _gen_layer_arrays(self, key: int) -> Generator[np.ndarray, None, None]:
+        """
+        Breadth-first search from a vertex, one frontier at a time.
+        Yields sorted uint64 arrays of the vertex keys at distance 0, 1, 2, ... from the vertex.
+        """
+        previous = np.empty(0, dtype=np.uint64)
+        current = np.array([key], dtype=np.uint64)
+        while len(current) > 0:
+            yield current
+            following = _get_sorted_unique(self.get_neighbour_array(current))
+            following = _get_sorted_difference(following, current)
+            following = _get_sorted_difference(following, previous)
+            previous, current = current, following
+
+    def _gen_layers(self, key: int) -> Generator[list[int], None, None]:
+        """
+        Breadth-first search from a vertex.
+        Yields the vertex keys at distance 0, 1, 2, ... from the vertex.
+        In an undirected graph the neighbours of a layer lie in the previous,
+        the same or the following layer, so only two layers are kept.
+        """
+        if self.is_vectorized():
+            for layer in self._gen_layer_arrays(key):
+                yield layer.tolist()
+            return
+        previous, current = set(), {key}
+        while current:
+            yield list(current)
+            following = set()
+            for k in current:
+                for neighbour in self.gen_neighbour_keys(k):
+                    if neighbour not in current and neighbour not in previous:
+                        following.add(neighbour)
+            previous, current = current, following
+
+    def _get_component_keys(self, key: int) -> list[int]:
+        """
+        Get the vertex keys of the connected component of a vertex
+        """
+        return [k for layer in self._gen_layers(key) for k in layer]
+
+    def get_layer_sizes(self, p: PauliString) -> list[int]:
+        """
+        Get the number of vertices at distance 0, 1, 2, ... from a Pauli string
+        """
+        if self.is_vectorized():
+            return [len(layer) for layer in self._gen_layer_arrays(self.get_key(p))]
+        return [len(layer) for layer in self._gen_layers(self.get_key(p))]
+
+    def get_shortest_path_lengths(self, p: PauliString) -> dict[str, int]:
+        """
+        Get the shortest path lengths from a Pauli string to all vertices of its connected component
+        """
+        return {str(self.get_pauli_string(k)): distance
+                for distance, layer in enumerate(self._gen_layers(self.get_key(p)))
+                for k in layer}
+
+    def get_component_keys(self, p: PauliString) -> list[int]:
+        """
+        Get the vertex keys of the connected component of a Pauli string
+        """
+        return self._get_component_keys(self.get_key(p))
+
+    def get_component_array(self, p: PauliString) -> np.ndarray:
+        """
+        Get the vertex keys of the connected component of a Pauli string as a uint64 array
+        """
+        if not self.is_vectorized():
+            raise CommutatorGraphException(f"Vertex arrays are supported up to "
+                                           f"{WORD_SIZE // 2} qubits")
+        return np.concatenate(list(self._gen_layer_arrays(self.get_key(p))))
+
+    def get_component(self, p: PauliString) -> list[PauliString]:
+        """
+        Get the connected component of a Pauli string
+        """
+        return [self.get_pauli_string(k) for k in self._get_component_keys(self.get_key(p))]
+
+    def get_component_size(self, p: PauliString) -> int:
+        """
+        Get the size of the connected component of a Pauli string
+        """
+        return sum(self.get_layer_sizes(p))
+
+    def get_shortest_path(self, source: PauliString,
+                          target: PauliString) -> list[PauliString] | None:
+        """
+        Get a shortest path between two Pauli strings
+        Returns the list of vertices of the path or None if the strings are not connected
+        """
+        source_key = self.get_key(source)
+        target_key = self.get_key(target)
+        parents = {source_key: None}
+        frontier = [source_key]
+        while frontier and target_key not in parents:
+            following = []
+            for k in frontier:
+                for neighbour in self.gen_neighbour_keys(k):
+                    if neighbour not in parents:
+                        parents[neighbour] = k
+                        following.append(neighbour)
+            frontier = following
+        if target_key not in parents:
+            return None
+        path = []
+        key = target_key
+        while key is not None:
+            path.append(self.get_pauli_string(key))
+            key = parents[key]
+        return path[::-1]
+
+    def _gen_component_keys(self) -> Generator[list[int], None, None]:
+        """
+        Generate the connected components of the whole graph as lists of vertex keys,
+        ordered by their smallest vertex key
+        """
+        visited = set()
+        for key in range(4**self.n):
+            if key in visited:
+                continue
+            component = self._get_component_keys(key)
+            visited.update(component)
+            yield component
+
+    def is_dense(self) -> bool:
+        """
+        Check if the whole graph is small enough to be labelled in index space
+        """
+        return self.is_vectorized() and self.n <= DENSE_SIZE
+
+    def get_component_labels(self) -> np.ndarray:
+        """
+        Label every vertex of the whole graph by the smallest vertex key of its component.
+        The labels form a forest pointing to smaller keys: every edge (u, u ^ g) hooks the
+        larger of the labels of its ends onto the smaller one, and pointer jumping flattens
+        the forest, until the labels of the ends of all edges agree.
+        Returns an int32 array of length 4^n
+        """
+        if not self.is_dense():
+            raise CommutatorGraphException(f"Component labels are supported up to "
+                                           f"{DENSE_SIZE} qubits with vectorized frontiers")
+        # The 2n-bit keys fit in 32 bits, which halves the memory traffic
+        keys = np.arange(4**self.n, dtype=np.uint32)
+        labels = np.arange(4**self.n, dtype=np.int32)
+        hooked = True
+        while hooked:
+            hooked = False
+            for g, swapped in zip(self.generators, self.swapped_generators.astype(np.uint32)):
+                sources = keys[(np.bitwise_count(keys & swapped) & 1).astype(bool)]
+                source_labels = labels[sources]
+                target_labels = labels[sources ^ np.uint32(g)]
+                mask = source_labels > target_labels
+                if mask.any():
+                    hooked = True
+                    np.minimum.at(labels, source_labels[mask], target_labels[mask])
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+        return labels
+
+    def get_component_ids(self) -> np.ndarray:
+        """
+        Get the number of the connected component of every vertex of the whole graph,
+        the components being ordered by their smallest vertex key
+        Returns an int64 array of length 4^n
+        """
+        labels = self.get_component_labels()
+        roots = np.flatnonzero(labels == np.arange(len(labels)))
+        return np.searchsorted(roots, labels)
+
+    def get_connected_components(self) -> list[list[PauliString]]:
+        """
+        Get the connected components of the whole commutator graph
+        """
+        if not self.is_dense():
+            return [[self.get_pauli_string(k) for k in component]
+                    for component in self._gen_component_keys()]
+        component_ids = self.get_component_ids()
+        order = np.argsort(component_ids, kind="stable")
+        pauli_strings = get_packed_from_indices(order, self.n).get_pauli_strings()
+        ends = np.cumsum(np.bincount(component_ids)).tolist()
+        return [pauli_strings[start:end] for start, end in zip([0] + ends[:-1], ends)]
+
+    def get_component_sizes(self) -> list[int]:
+        """
+        Get the sizes of the connected components of the whole commutator graph
+        """
+        if not self.is_dense():
+            return [len(component) for component in self._gen_component_keys()]
+        return np.bincount(self.get_component_ids()).tolist()
+
+    def gen_edge_keys(self) -> Generator[tuple[int, int], None, None]:
+        """
+        Generate the edges of the whole commutator graph as pairs of vertex keys (a, b) with a < b
+        """
+        for key in range(4**self.n):
+            for neighbour in sorted(self.gen_neighbour_keys(key)):
+                if key < neighbour:
+                    yield key, neighbour
@@ -1,32 +1,80 @@
 """
 Get anticommutator graph
 """
-from itertools import combinations
+import numpy as np
 from paulie.common.pauli_string_bitarray import PauliString
+from paulie.common.pauli_string_packed import PauliStringPacked, get_packed
 
-def get_graph(generators:list[PauliString], commutators:list[PauliString]=None
-, flag_labels:bool = True
+
+def _get_packed(pauli_strings: list[PauliString | str]) -> PauliStringPacked:
+    """
+    Get the packed representation of a list of Pauli strings.
+    The entries given as str are parsed into PauliString.
+    """
+    return get_packed([p if isinstance(p, PauliString) else PauliString(pauli_str=str(p))
+                       for p in pauli_strings])
+
+
+def get_graph_edges(generators: list[PauliString],
+                    commutators: list[PauliString | str] = None,
+                    packed: PauliStringPacked = None) -> np.ndarray:
+    """
+    Get the edges of the anticommutator graph as pairs of vertex indices.
+    The anticommuting pairs are found in one batched symplectic-product step,
+    restricted to the pairs of strings with overlapping supports when these are rare.
+    Args:
+        generators: Array of PauliString
+        commutators: The area of Pauli strings over which to build a graph.
+        packed: Packed representation of the generators, computed if not given
+    Returns an integer array of shape (count_edges, 2) with i < j in every row,
+    ordered as itertools.combinations(generators, 2)
+    """
+    if packed is None:
+        packed = _get_packed(generators)
+    edges = packed.get_anticommuting_pairs()
+    if commutators is not None and len(commutators) > 0:
+        products = packed[edges[:, 0]].multiply(packed[edges[:, 1]])
+        edges = edges[products.get_isin_mask(_get_packed(commutators))]
+    return edges
+
+
+def get_edge_labels(generators: list[PauliString], edges: np.ndarray,
+                    packed: PauliStringPacked = None) -> list[str]:
+    """
+    Get the labels of the edges of the anticommutator graph,
+    that is the products of the vertices of every edge
+    Args:
+        generators: Array of PauliString
+        edges: Pairs of vertex indices
+        packed: Packed representation of the generators, computed if not given
+    Returns the list of labels
+    """
+    if packed is None:
+        packed = _get_packed(generators)
+    products = packed[edges[:, 0]].multiply(packed[edges[:, 1]])
+    return [str(p) for p in products.get_pauli_strings()]
+
+
+def get_graph(generators:list[PauliString], commutators:list[PauliString | str]=None
+, flag_labels:bool = True, packed:PauliStringPacked = None
 ) -> (tuple[list[str], list[tuple[str, str]], dict[tuple[str, str], str]]
      |tuple[list[str], list[tuple[str, str]]]):
     """
     Get anticommutator graph
     Args:
         generators: Array of PauliString
-        commutators: The area of Pauli strings over which to build a graph. 
+        commutators: The area of Pauli strings over which to build a graph.
+        flag_labels: Whether to return the labels of edges
+        packed: Packed representation of the generators, computed if not given
     Returns the vertices, edges, and labels of edges
     """
-    if not commutators:
-        commutators = []
     vertices = [str(g) for g in generators]
-    edge_labels = {}
-    edges = []
-    for a, b in combinations(generators, 2):
-        c = a^b
-        if c and (len(commutators) == 0 or c in commutators):
-            edges.append((str(a), str(b)))
-            if flag_labels:
-                edge_labels[(str(a), str(b))] = str(c)
+    if packed is None:
+        packed = _get_packed(generators)
+    edge_indices = get_graph_edges(generators, commutators=commutators, packed=packed)
+    edges = [(vertices[i], vertices[j]) for i, j in edge_indices.tolist()]
     if flag_labels:
+        edge_labels = dict(zip(edges, get_edge_labels(generators, edge_indices, packed=packed)))
         return vertices, edges, edge_labels
     else:
         return vertices, edges
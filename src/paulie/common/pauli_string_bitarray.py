@@ -4,6 +4,7 @@ from six.moves import reduce
 import numpy as np
 from bitarray import bitarray
 from bitarray.util import count_and, count_or, ba2int
+from scipy.sparse import csr_array
 
 from paulie.common.pauli_string_parser import pauli_string_parser
 
@@ -19,6 +20,23 @@ Sx = np.array([[0,1],[1,0]])
 Sy = np.array([[0,-1j],[1j,0]])
 Sz = np.array([[1,0],[0,-1]])
 
+
+def get_basis_indices(n: int) -> np.ndarray:
+    """
+    Get the indices of the computational basis states of n qubits, qubit 0 is the most
+    significant bit
+    """
+    if n > 63:
+        raise ValueError("The state space of more than 63 qubits cannot be indexed")
+    return np.arange(1 << n, dtype=np.uint64)
+
+
+def get_signs(indices: np.ndarray, z: int) -> np.ndarray:
+    """
+    Get the signs (-1)^popcount(b & z) of the Z-part of a Pauli string on basis states b
+    """
+    return 1 - 2 * (np.bitwise_count(indices & np.uint64(z)) & 1).astype(np.int8)
+
 class PauliString:
     """Representation of a Pauli string as a bitarray."""
 
@@ -32,6 +50,7 @@ class PauliString:
         """
         super().__init__()
         self.nextpos = 0
+        self._index = None
         if bits is not None:
             self.bits = bits.copy()
         elif n is not None and pauli_str is None:
@@ -48,9 +67,12 @@ class PauliString:
 
     def get_index(self) -> int:
         """
-         Return index in matrix decomposition vector
+         Return index in matrix decomposition vector.
+         The index is cached and used as the key for hashing, equality and ordering.
         """
-        return ba2int(self.bits)
+        if self._index is None:
+            self._index = ba2int(self.bits) if len(self.bits) > 0 else 0
+        return self._index
 
     def get_diagonal_index(self) -> int:
         """
@@ -91,14 +113,30 @@ class PauliString:
     def _ensure_pauli_string(self, other:str|Self):
         return other if isinstance(other, PauliString) else PauliString(pauli_str=str(other))
 
+    def _compare(self, other:str|Self) -> int:
+        """
+        Three-way comparison of two Pauli strings by their bit value.
+        Pauli strings of the same length are compared by their cached integer keys,
+        other values are parsed into Pauli strings and compared by their bits,
+        which is an explicit slow fallback.
+        Args:
+             other: The Pauli string to compare with
+        Returns -1, 0 or 1
+        """
+        if isinstance(other, PauliString) and len(self.bits) == len(other.bits):
+            a, b = self.get_index(), other.get_index()
+        else:
+            other = self._ensure_pauli_string(other)
+            a, b = self.bits, other.bits
+        return (a > b) - (a < b)
+
     def __eq__(self, other:str|Self) -> bool:
         """Overloading the equality operator relating two Pauli strings.
         Args:
              other: The Pauli string to compare with
         Returns the result of the comparison
         """
-        other = self._ensure_pauli_string(other)
-        return self.bits == other.bits
+        return self._compare(other) == 0
 
     def __lt__(self, other:str|Self) -> bool:
         """
@@ -107,8 +145,7 @@ class PauliString:
              other: The Pauli string to compare with
         Returns the result of the comparison
         """
-        other = self._ensure_pauli_string(other)
-        return self.bits < other.bits
+        return self._compare(other) < 0
 
     def __le__(self, other:str|Self) -> bool:
         """
@@ -117,8 +154,7 @@ class PauliString:
              other: The Pauli string to compare with
         Returns the result of the comparison
         """
-        other = self._ensure_pauli_string(other)
-        return self.bits <= other.bits
+        return self._compare(other) <= 0
 
     def __gt__(self, other:str|Self) -> bool:
         """
@@ -127,8 +163,7 @@ class PauliString:
              other: The Pauli string to compare with
         Returns the result of the comparison
         """
-        other = self._ensure_pauli_string(other)
-        return self.bits > other.bits
+        return self._compare(other) > 0
 
     def __ge__(self, other:str|Self) -> bool:
         """
@@ -137,8 +172,7 @@ class PauliString:
              other: The Pauli string to compare with
         Returns the result of the comparison
         """
-        other = self._ensure_pauli_string(other)
-        return self.bits >= other.bits
+        return self._compare(other) >= 0
 
     def __ne__(self, other:str|Self) -> bool:
         """
@@ -147,12 +181,11 @@ class PauliString:
              other: The Pauli string to compare with
         Returns the result of the comparison
         """
-        other = self._ensure_pauli_string(other)
-        return self.bits != other.bits
+        return self._compare(other) != 0
 
     def __hash__(self) -> int:
         """Make PauliString hashable so it can be used in sets"""
-        return hash(str(self.bits))
+        return hash(self.get_index())
 
     def __len__(self) -> int:
         """
@@ -294,6 +327,7 @@ class PauliString:
         Set substring starting at position `start`
         """
         pauli_string = self._ensure_pauli_string(pauli_string)
+        self._index = None
 
         for i in range(0, len(pauli_string)):
             self.bits[2*start + 2*i] = pauli_string.bits[2*i]
@@ -351,6 +385,7 @@ class PauliString:
         """
         Pauli string increment operator
         """
+        self._index = None
         for i in reversed(range(len(self.bits))):
             if self.bits[i] == 0:
                 self.bits[i] = 1
@@ -451,13 +486,54 @@ class PauliString:
             case "Z":
                 return Sz
 
-    def get_matrix(self) -> np.array:
+    def get_masks(self) -> tuple[int, int]:
+        """
+        Get the X-part and the Z-part of the Pauli string as integer masks over the
+        computational basis indices, qubit 0 is the most significant bit.
+        The Pauli string acts on basis states as P|b> = i^nY (-1)^popcount(b & z) |b ^ x>.
+        """
+        if len(self) == 0:
+            return 0, 0
+        return ba2int(self.bits_even), ba2int(self.bits_odd)
+
+    def get_phase(self) -> complex:
+        """
+        Get the phase i^nY of the action of the Pauli string on basis states
+        """
+        return 1j ** (count_and(self.bits_even, self.bits_odd) % 4)
+
+    def get_matrix(self, sparse: bool = False) -> np.array:
         """
         Get matrix representation for Pauli string
+        Args:
+            sparse: If True, then the matrix is returned as a scipy CSR array.
+                    A Pauli string is a phased permutation matrix with one entry per row.
         Returns: Matrix representation for the Pauli string
         """
-        return reduce(lambda matrix, v: np.kron(matrix, self._match_matrix(v))
-                      if matrix is not None else self._match_matrix(v), str(self), None)
+        if not sparse:
+            return reduce(lambda matrix, v: np.kron(matrix, self._match_matrix(v))
+                          if matrix is not None else self._match_matrix(v), str(self), None)
+        x, z = self.get_masks()
+        rows = get_basis_indices(len(self))
+        cols = rows ^ np.uint64(x)
+        data = self.get_phase() * get_signs(cols, z)
+        return csr_array((data, cols.astype(np.int64), np.arange(len(rows) + 1)),
+                         shape=(len(rows), len(rows)))
+
+    def apply(self, state: np.ndarray) -> np.ndarray:
+        """
+        Apply the Pauli string to a state vector without forming its matrix
+        Args:
+            state: State vector of shape (2^n,) or matrix of shape (2^n, k) of state vectors
+        Returns P @ state
+        """
+        state = np.asarray(state)
+        if state.shape[0] != 1 << len(self):
+            raise ValueError("Incorrect state size")
+        x, z = self.get_masks()
+        cols = get_basis_indices(len(self)) ^ np.uint64(x)
+        signs = (self.get_phase() * get_signs(cols, z)).reshape(-1, *[1] * (state.ndim - 1))
+        return signs * state[cols]
 
     def get_count_non_trivially(self) -> int:
         """ Get count non-trivially"""
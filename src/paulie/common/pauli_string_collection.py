@@ -5,9 +5,21 @@ from itertools import combinations
 from typing import Self, Generator
 import numpy as np
 import networkx as nx
+from bitarray.util import int2ba
 from paulie.common.pauli_string_bitarray import PauliString
-from paulie.common.pauli_string_linear import PauliStringLinear
+from paulie.common.pauli_string_linear import TOLERANCE, PauliStringLinear
+from paulie.common.pauli_string_packed import (
+    PauliStringPacked,
+    get_packed,
+    get_packed_all
+)
 from paulie.common.get_graph import get_graph
+from paulie.common.commutator_graph import CommutatorGraph
+from paulie.common.commutant import (
+    get_commutant_basis_indices,
+    gen_group_indices,
+    gen_commutants
+)
 from paulie.classifier.classification import Classification
 from paulie.classifier.morph_factory import MorphFactory
 from paulie.classifier.recording_morph_factory import RecordingMorphFactory
@@ -42,6 +54,8 @@ class PauliStringCollection:
         self.generators: list[PauliString] = []
         self.classification: Classification = None
         self.record: RecordGraph = None
+        self.packed: PauliStringPacked = None
+        self.positions: dict[PauliString, int] = None
         if not generators:
             return
 
@@ -99,9 +113,32 @@ class PauliStringCollection:
         self.nextpos += 1
         return value
 
+    def _invalidate(self) -> None:
+        """Reset the classification and the cached views after the collection changes"""
+        self.classification = None
+        self.packed = None
+        self.positions = None
+
+    def _get_positions(self) -> dict[PauliString, int]:
+        """
+        Get the hash index of the collection mapping each Pauli string to its first position.
+        The index is built lazily and kept up to date by append.
+        """
+        if self.positions is None:
+            self.positions = {}
+            for i, g in enumerate(self.generators):
+                self.positions.setdefault(g, i)
+        return self.positions
+
+    def __contains__(self, p: PauliString) -> bool:
+        """Checking a Pauli string for inclusion in the collection in constant time"""
+        if not isinstance(p, PauliString):
+            p = PauliString(pauli_str=str(p))
+        return p in self._get_positions()
+
     def __delitem__(self, key) -> PauliString:
         """Overloading the remove operator for a collection"""
-        self.classification = None
+        self._invalidate()
         del self.generators[key]
 
     def __copy__(self) -> Self:
@@ -140,7 +177,7 @@ class PauliStringCollection:
     def expand(self, n: int) -> None:
         """ Expands each string in the collection to specificed length n by taking
         the tensor product with identities"""
-        self.classification = None
+        self._invalidate()
         new_generators = []
         for g in enumerate(self.generators):
             g = g.expand(n)
@@ -149,10 +186,11 @@ class PauliStringCollection:
     def _processing(self, p: PauliString) -> PauliString:
         """ Enforcing that each string in the collection
         is of the same size.  Each string will be expanded
-        with identities to have the length of the longest Pauli string."""
+        with identities to have the length of the longest Pauli string.
+        All the strings of the collection already share this length."""
         if len(self.generators) == 0:
             return p
-        longest = len(max(self.generators, key=len))
+        longest = self.get_size()
         if len(p) < longest:
             p = p.expand(longest)
         elif len(p) > longest:
@@ -162,26 +200,36 @@ class PauliStringCollection:
     def append(self, p: PauliString) -> None:
         """Append a specified Pauli string to the collection to the end """
         self.classification = None
+        self.packed = None
         p = self._processing(p)
-        if p not in self.generators:
+        positions = self._get_positions()
+        if p not in positions:
+            positions[p] = len(self.generators)
             self.generators.append(p)
 
     def insert(self, i: int, p: PauliString) -> None:
         """Insert a specificed Pauli string to the collection at a specificed position"""
         self.classification = None
+        self.packed = None
         p = self._processing(p)
-        if p not in self.generators:
+        if p not in self:
             self.generators.insert(i, p)
+            self.positions = None
 
     def remove(self, p: PauliString) -> None:
         """Remove a specificed Pauli string from the collection"""
         self.classification = None
-        if p in self.generators:
+        self.packed = None
+        if p in self:
             self.generators.remove(p)
+            self.positions = None
 
     def index(self, p: PauliString) -> int:
         """Returns the index of a given Pauli string inside the collection"""
-        return self.generators.index(p)
+        index = self.find(p)
+        if index == -1:
+            raise ValueError(f"{p} is not in collection")
+        return index
 
     def get_size(self) -> int:
         """ Get the length of the Pauli Strings in the collection"""
@@ -198,20 +246,46 @@ class PauliStringCollection:
     def sort(self) -> Self:
         """ Sort the collection Pauli strings according to their bit value
          given by the bitarray representation """
+        self._invalidate()
         self.generators.sort()
         return self
 
+    def get_packed(self) -> PauliStringPacked:
+        """
+        Get the collection packed into two contiguous uint64 matrices (X-part and Z-part).
+        The packed view is cached and rebuilt after the collection changes.
+        """
+        if self.packed is None:
+            self.packed = get_packed(self.generators, n=self.get_size())
+        return self.packed
+
+    def get_support_index(self) -> list[np.ndarray]:
+        """
+        Get the inverted index of the supports of the collection: entry q is the sorted array
+        of the positions of the Pauli strings acting non-trivially on qubit q.
+        The index is cached with the packed view.
+        """
+        return self.get_packed().get_support_index()
+
+    def _get_packed_area(self, generators: list[PauliString] | Self = None
+                         ) -> tuple[PauliStringPacked, list[PauliString] | None]:
+        """
+        Get the packed search area and, if it is given explicitly, the list of its Pauli strings.
+        If the search area is not specified, then it is all Pauli strings of the same size.
+        """
+        if generators is None:
+            return get_packed_all(self.get_size()), None
+        if isinstance(generators, PauliStringCollection):
+            return generators.get_packed(), generators.get()
+        generators = list(generators)
+        return get_packed(generators, n=self.get_size()), generators
+
     def get_anticommutation_fraction(self) -> float:
         """
         Computes the fraction of anticommuting pairs of generators
         """
-        anti_commute_count = 0
-        pair = 0
-        for x,y in combinations(self.generators, r=2):
-            pair += 1
-            if not x|y:
-                anti_commute_count += 1
-        return anti_commute_count / pair
+        anti_commute_count = self.get_packed().get_count_anticommuting_pairs()
+        return anti_commute_count / self.get_pair()
 
     def get_pair(self) -> int:
         """
@@ -223,40 +297,42 @@ class PauliStringCollection:
         """
         get number of anticommutation pair
         """
-        anti_commute_count = 0
-        for x,y in combinations(self.generators, r=2):
-            if not x|y:
-                anti_commute_count += 1
+        anti_commute_count = self.get_packed().get_count_anticommuting_pairs()
         n = len(self.generators)
         n_com = n*(n-1)/2
         return anti_commute_count / n_com
 
-    def get_commutants(self) -> 'PauliStringCollection':
+    def get_commutants(self, basis: bool = False) -> 'PauliStringCollection':
         """
         Get the set of Pauli strings that commute with ALL generators in this collection.
         This finds the linear symmetries L_j of the system.
+        The commutant is the symplectic complement of the generators and is found
+        by Gaussian elimination over GF(2), so the cost is polynomial in the number of qubits
+        plus the size of the returned collection.
+        Args:
+            basis: If True, return only a basis of the commutant group (up to phases),
+                   otherwise all its elements ordered by their bit value.
         """
         if not self.generators:
             # If there are no generators, all Paulis are symmetries by definition.
             # However, a group with no generators is trivial, so we can return empty.
             return PauliStringCollection([])
 
-        num_qubits = self.get_size()
-
-        # Start with a list of all possible Pauli strings.
-        # Note: gen_all_pauli_strings is a method on the PauliString object.
-        identity = self.create_instance(n=num_qubits)
-        candidate_symmetries = list(identity.gen_all_pauli_strings())
+        n = self.get_size()
+        keys = get_commutant_basis_indices(self.generators, n)
+        if not basis:
+            keys = sorted(gen_group_indices(keys))
 
-        # For each generator in our system, filter the candidate list.
-        for g in self.generators:
-            # Keep only the candidates that commute with the current generator g.
-            candidate_symmetries = [
-                p for p in candidate_symmetries if g.commutes_with(p)
-            ]
+        # Return the commutant as a new collection.
+        return PauliStringCollection([PauliString(bits=int2ba(k, length=2 * n)) for k in keys])
 
-        # Return the final filtered list as a new collection.
-        return PauliStringCollection(candidate_symmetries)
+    def gen_commutants(self) -> Generator[PauliString, None, None]:
+        """
+        Lazily enumerate the Pauli strings that commute with ALL generators in this collection.
+        """
+        if not self.generators:
+            return
+        yield from gen_commutants(self.generators, self.get_size())
 
     def get_anti_commutants(self, generators: list[PauliString] | Self = None) -> Self:
         """
@@ -269,11 +345,11 @@ class PauliStringCollection:
         """
         if len(self) == 0:
             return PauliStringCollection([])
-        for p in self:
-            generators = PauliStringCollection(
-                p.get_anti_commutants(generators=generators)
-            )
-        return generators
+        packed, generators = self._get_packed_area(generators)
+        mask = packed.get_anti_commutants_mask(self.get_packed())
+        if generators is None:
+            return PauliStringCollection(packed[mask].get_pauli_strings())
+        return PauliStringCollection([g for g, m in zip(generators, mask) if m])
 
     def get_graph(
         self, generators: list[PauliString] | Self = None
@@ -286,7 +362,7 @@ class PauliStringCollection:
         Returns:
               vertices, edges, and labels of edges of the anticommutation graph
         """
-        return get_graph(self.generators, commutators=generators)
+        return get_graph(self.get(), commutators=generators, packed=self.get_packed())
 
     def get_commutator_graph(self
     ) -> tuple[list[str], list[tuple[str, str]], dict[tuple[str, str], str]]:
@@ -295,9 +371,17 @@ class PauliStringCollection:
         and an edge between two vertices exist if there is a element in the generator
         to which the one vertex anticommutes with to the other vertex.
         """
-        n = self.get_size()
-        i = PauliString(n=n)
-        return get_graph(i.get_commutants(), commutators=self, flag_labels=False)
+        vertices = [str(p) for p in PauliString(n=self.get_size()).gen_all_pauli_strings()]
+        graph = self.get_implicit_commutator_graph()
+        edges = [(vertices[a], vertices[b]) for a, b in graph.gen_edge_keys()]
+        return vertices, edges
+
+    def get_implicit_commutator_graph(self) -> CommutatorGraph:
+        """
+        Get the commutator graph as an implicit graph whose neighbours are computed on the fly,
+        without enumerating all Pauli strings of a given dimension.
+        """
+        return CommutatorGraph(self.generators)
 
     def get_frame_potential(self) -> int:
         """
@@ -305,12 +389,9 @@ class PauliStringCollection:
         generated by the collection.
         The frame potential is a measure of quantum choas.
         """
-        vertices, edges = self.get_commutator_graph()
-        graph = nx.Graph()
-        graph.add_nodes_from(vertices)
-        graph.add_edges_from(edges)
-        n_comp= nx.number_connected_components(graph)
-        n_iso =len(list(nx.isolates(graph)))
+        sizes = self.get_implicit_commutator_graph().get_component_sizes()
+        n_comp = len(sizes)
+        n_iso = sizes.count(1)
         return n_comp*n_iso
 
     def _convert(self, generators: list[str]) -> str:
@@ -510,9 +591,11 @@ class PauliStringCollection:
             ValueError: If graph_type is not 'anticommutator' or 'commutator'.
         """
         if graph_type == 'anticommutator':
-            nodes, edges = self.get_graph() # The anti-commutation graph
+            nodes, edges, _ = self.get_graph() # The anti-commutation graph
         elif graph_type == 'commutator':
-            nodes, edges = self.get_commutator_graph() # The commutator graph
+            # The commutator graph is traversed implicitly
+            return [PauliStringCollection(component) for component in
+                    self.get_implicit_commutator_graph().get_connected_components()]
         else:
             raise ValueError("graph_type must be 'anticommutator' or 'commutator'")
 
@@ -604,7 +687,7 @@ class PauliStringCollection:
             squared_norm_trace = (q_vector.h @ q_vector).trace()
 
             # The trace should be real and positive for a non-zero operator
-            if squared_norm_trace.real > 1e-12:
+            if squared_norm_trace.real > TOLERANCE:
                 # The Hilbert-Schmidt norm is the sqrt of this trace
                 norm = np.sqrt(squared_norm_trace.real)
                 normalized_basis.append(q_vector * (1.0 / norm))
@@ -613,10 +696,9 @@ class PauliStringCollection:
 
     def find(self, pauli_string: PauliString) -> int:
         """Find index pauli string in collection"""
-        for i in enumerate(self.generators):
-            if self.generators[i] == pauli_string:
-                return i
-        return -1
+        if not isinstance(pauli_string, PauliString):
+            pauli_string = PauliString(pauli_str=str(pauli_string))
+        return self._get_positions().get(pauli_string, -1)
 
     def replace(self, pauli_string: PauliString, new_pauli_string: PauliString) -> None:
         """
@@ -626,6 +708,7 @@ class PauliStringCollection:
         """
         index = self.find(pauli_string)
         if index != -1:
+            self._invalidate()
             self.generators[index] = new_pauli_string.copy()
 
     def contract(self, pauli_string: PauliString, contracted_pauli_string: PauliString) -> None:
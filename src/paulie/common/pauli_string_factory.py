@@ -7,6 +7,7 @@ from bitarray import bitarray
 from paulie.common.pauli_string_linear import PauliStringLinear
 from paulie.common.pauli_string_bitarray import PauliString
 from paulie.common.pauli_string_collection import PauliStringCollection
+from paulie.common.pauli_string_sparse import PauliStringSparse, get_sparse
 
 def get_identity(n: int) -> PauliString:
     """
@@ -49,6 +50,23 @@ def get_pauli_string(o, n:int = None) -> PauliString|PauliStringCollection:
         return PauliStringCollection(list(gen_k_local_generators(n, generators.get())))
     return generators
 
+def get_sparse_pauli_string(o, n:int = None) -> PauliStringSparse|list[PauliStringSparse]:
+    """
+    Get Pauli strings in the sparse representation, for low-weight strings on many qubits
+    Args:
+         o - a Pauli string, in the notation of pauli_string_parser or dense,
+             or a list of Pauli strings.
+         n - length of Pauli strings
+    Returns a PauliStringSparse, or a list of them if o is a list
+    """
+    if isinstance(o, PauliStringSparse):
+        return o if n is None else o.expand(n)
+    if isinstance(o, PauliString):
+        return get_sparse(o) if n is None else get_sparse(o).expand(n)
+    if isinstance(o, str):
+        return PauliStringSparse(pauli_str=o, n=n)
+    return [get_sparse_pauli_string(p, n) for p in o]
+
 
 class Used:
     """
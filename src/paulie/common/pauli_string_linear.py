@@ -1,10 +1,21 @@
 """Representation of a Pauli string as a bitarray."""
-from collections import defaultdict
 from typing import Self, Generator
 
-from six.moves import reduce
 import numpy as np
-from paulie.common.pauli_string_bitarray import PauliString
+from bitarray.util import int2ba
+from scipy.sparse import coo_array
+from scipy.linalg import expm
+from scipy.sparse.linalg import LinearOperator, expm_multiply
+from scipy.sparse.linalg import expm as sparse_expm
+from paulie.common.pauli_string_bitarray import PauliString, get_basis_indices, get_signs
+from paulie.common.pauli_string_packed import (
+    PauliStringPacked,
+    get_packed_from_keys,
+    multiply_outer,
+)
+
+
+TOLERANCE = 1e-12
 
 
 class PauliStringLinearException(Exception):
@@ -16,18 +27,133 @@ class PauliStringLinearException(Exception):
 class PauliStringLinear(PauliString):
     """Representation of a linear combination of Pauli string."""
 
-    def __init__(self, combinations: list[tuple[complex, str | PauliString]]) -> None:
+    def __init__(self, combinations: list[tuple[complex, str | PauliString]],
+                 n: int = None) -> None:
         """Initialize a linear combination of Pauli strings.
-        
+
+        The terms are stored in canonical form: a map from the index of the Pauli string
+        (see PauliString.get_index) to its coefficient, so that equal Pauli strings
+        are always combined. Products keep instead the packed Pauli strings and the vector
+        of their coefficients, each form is built from the other only when needed and
+        PauliString objects are only created when the terms are iterated.
+
         Args:
             combination: list of tuple (weight, Pauli string),
             weight - weight of Pauli string in linear combination,
             Pauli string - Pauli string like PauliString or string
+            n: Length of the Pauli strings. If not specified, then the length of the first string
+        """
+        if n is None:
+            n = len(str(combinations[0][1])) if combinations else 0
+        super().__init__(n=n)
+        self.n = n
+        # Canonical map {index: coefficient}, None until built from the packed form
+        self._terms = {}
+        # Packed Pauli strings and their coefficients, None until built from the map
+        self._packed = None
+        self._coeffs = None
+        for coeff, pauli in combinations:
+            self._add_term(coeff, pauli)
+
+    @property
+    def terms(self) -> dict[int, complex]:
+        """
+        Canonical map from the index of the Pauli strings (see PauliString.get_index)
+        to their coefficients
+        """
+        if self._terms is None:
+            self._terms = dict(zip(self._packed.get_indices(), self._coeffs.tolist()))
+        return self._terms
+
+    @terms.setter
+    def terms(self, terms: dict[int, complex]) -> None:
+        """
+        Replace the canonical map of the linear combination
+        """
+        self._terms = terms
+        self._clear_packed()
+
+    def set_packed(self, packed: PauliStringPacked, coeffs: np.ndarray) -> None:
         """
-        num_qubits = len(str(combinations[0][1])) if combinations else 0
-        super().__init__(n=num_qubits)
-        self.nextpos = 0
-        self.combinations = [(c[0], PauliString(pauli_str=str(c[1]))) for c in combinations]
+        Replace the terms of the linear combination by a packed representation
+        Args:
+            packed: Distinct packed Pauli strings of the length of the linear combination,
+                    see get_reduced
+            coeffs: Complex coefficients of the Pauli strings
+        """
+        self._check_size(packed.get_size())
+        self._terms = None
+        self._packed = packed
+        self._coeffs = np.asarray(coeffs, dtype=complex)
+
+    def _clear_packed(self) -> None:
+        """
+        Drop the packed representation after a change of the canonical map
+        """
+        self._packed = None
+        self._coeffs = None
+
+    def _get_term(self, key: int) -> PauliString:
+        """
+        Build the Pauli string of a term from its index
+        """
+        if self.n == 0:
+            return PauliString(n=0)
+        return PauliString(bits=int2ba(key, length=2 * self.n))
+
+    def _get_coefficients(self) -> np.ndarray:
+        """
+        Get the vector of the coefficients of the terms
+        """
+        if self._terms is None:
+            return self._coeffs
+        return np.array(list(self._terms.values()), dtype=complex)
+
+    def _check_size(self, n: int) -> None:
+        """
+        Check that a term has the length of the Pauli strings of the linear combination
+        """
+        if n != self.n:
+            raise ValueError("Pauli strings of a linear combination must have the same length")
+
+    def _add_term(self, coeff: complex, pauli: str | PauliString) -> None:
+        """
+        Add a term to the linear combination, combining it with an equal Pauli string.
+        Only the index of the Pauli string is kept.
+        """
+        if type(pauli) is not PauliString: # pylint: disable=unidiomatic-typecheck
+            pauli = PauliString(pauli_str=str(pauli))
+        self._check_size(len(pauli))
+        key = pauli.get_index()
+        terms = self.terms
+        if key in terms:
+            terms[key] += coeff
+        else:
+            terms[key] = coeff
+        self._clear_packed()
+
+    def _remove_term(self, key: int) -> None:
+        """
+        Remove the term with the given index of its Pauli string
+        """
+        del self.terms[key]
+        self._clear_packed()
+
+    @property
+    def combinations(self) -> list[tuple[complex, PauliString]]:
+        """
+        List of tuple (weight, Pauli string) of the linear combination
+        """
+        return [(coeff, self._get_term(key)) for key, coeff in self.terms.items()]
+
+    @combinations.setter
+    def combinations(self, combinations: list[tuple[complex, str | PauliString]]) -> None:
+        """
+        Replace the terms of the linear combination
+        """
+        self.terms = {}
+        for coeff, pauli in combinations:
+            self._add_term(coeff, pauli)
 
 
     def _gtzero(self, z: complex) -> bool:
@@ -101,17 +227,17 @@ class PauliStringLinear(PauliString):
         self_simplified = self.simplify()
         other_simplified = other.simplify()
 
-        # Create dictionaries for easy lookup: {pauli_str: coefficient}
-        self_dict = {str(p): c for c, p in self_simplified.combinations}
-        other_dict = {str(p): c for c, p in other_simplified.combinations}
+        # The canonical maps {Pauli string index: coefficient} are compared directly
+        self_dict = self_simplified.terms
+        other_dict = other_simplified.terms
 
         # Check if they have the same Pauli string terms
         if self_dict.keys() != other_dict.keys():
             return False
 
         # Check if the coefficients for each term are close enough
-        for pauli_str, self_coeff in self_dict.items():
-            other_coeff = other_dict[pauli_str]
+        for key, self_coeff in self_dict.items():
+            other_coeff = other_dict[key]
             if not np.isclose(self_coeff, other_coeff):
                 return False
 
@@ -170,31 +296,24 @@ class PauliStringLinear(PauliString):
         """
         Returns the lenght of the Pauli string
         """
-        return len(self.combinations)
-
-    def __iter__(self) -> Self:
-        """
-        Pauli String Iterator
-        """
-        self.nextpos = 0
-        return self
+        if self._terms is None:
+            return len(self._coeffs)
+        return len(self._terms)
 
-    def __next__(self) -> Self:
+    def __iter__(self) -> Generator[tuple[complex, PauliString], None, None]:
         """
-        The value of the next position of the Pauli string
+        Iterator over the tuples (weight, Pauli string) of the linear combination
         """
-        if self.nextpos >= len(self):
-            # we are done
-            raise StopIteration
-        value = self.combinations[self.nextpos]
-        self.nextpos += 1
-        return value
+        for key, coeff in self.terms.items():
+            yield coeff, self._get_term(key)
 
     def __setitem__(self, position: int, combination: tuple[complex,PauliString]):
         """
         Sets a specified Pauli at a given position in the Paulistring
         """
-        self.combinations[position] = combination
+        combinations = self.combinations
+        combinations[position] = combination
+        self.combinations = combinations
 
     def __getitem__(self, position: int) -> Self:
         """
@@ -206,31 +325,82 @@ class PauliStringLinear(PauliString):
         """
         Pauli string linear combination copy operator
         """
-        return PauliStringLinear(self.combinations)
+        return self.copy()
 
     def copy(self) -> Self:
         """ Copy Linear combination of Pauli strings """
-        return PauliStringLinear(self.combinations)
+        result = PauliStringLinear([], n=self.n)
+        if self._terms is None:
+            # The packed arrays are never changed in place, so they are shared
+            result.set_packed(self._packed, self._coeffs)
+        else:
+            result.terms = dict(self._terms)
+        return result
+
+    def _map_coefficients(self, func) -> Self:
+        """
+        Copy of the linear combination with a function applied to every coefficient
+        """
+        result = PauliStringLinear([], n=self.n)
+        if self._terms is None:
+            result.set_packed(self._packed, func(self._coeffs))
+        else:
+            result.terms = {key: func(coeff) for key, coeff in self._terms.items()}
+        return result
 
     def __add__(self, other):
         """Performs a robust addition of two linear combinations."""
-        # Use a dictionary to correctly sum coefficients
-        summed_coeffs = defaultdict(complex)
-        for coeff, pauli in self.combinations:
-            summed_coeffs[str(pauli)] += coeff
-        for coeff, pauli in other.combinations:
-            summed_coeffs[str(pauli)] += coeff
-
-        new_combinations = [(c, p) for p, c in summed_coeffs.items() if abs(c) > 1e-12]
-        if not new_combinations:
-            return PauliStringLinear([])
-        return PauliStringLinear(new_combinations)
+        result = self.copy()
+        result += other
+        return result.prune()
 
     def __iadd__(self, other):
         """Performs in-place addition."""
-        # This calls our robust __add__ method and reassigns self
-        new_self = self + other
-        self.combinations = new_self.combinations
+        return self.axpy(1.0, other)
+
+    def __isub__(self, other):
+        """Performs in-place subtraction."""
+        return self.axpy(-1.0, other)
+
+    def axpy(self, alpha: complex, other: Self) -> Self:
+        """
+        In-place scaled accumulation self += alpha * other.
+        Only the terms of other are visited, the terms that cancel out are removed.
+        Args:
+            alpha: Scalar factor of other
+            other: Linear combination of Pauli strings to accumulate
+        Returns this linear combination
+        """
+        if self.n == 0 and len(self) == 0:
+            self.n = other.n
+            super().__init__(n=self.n)
+        self._check_size(other.n)
+        terms = self.terms
+        for key, coeff in other.terms.items():
+            if key in terms:
+                coeff = terms[key] + alpha * coeff
+                if abs(coeff) <= TOLERANCE:
+                    del terms[key]
+                else:
+                    terms[key] = coeff
+            else:
+                terms[key] = alpha * coeff
+        self._clear_packed()
+        return self
+
+    def prune(self, tol: float = TOLERANCE) -> Self:
+        """
+        Remove in place the terms whose coefficient is at most tol in absolute value
+        Args:
+            tol: Drop tolerance
+        Returns this linear combination
+        """
+        if self._terms is None:
+            mask = np.abs(self._coeffs) > tol
+            self._packed, self._coeffs = self._packed[mask], self._coeffs[mask]
+            return self
+        for key in [key for key, coeff in self.terms.items() if abs(coeff) <= tol]:
+            self._remove_term(key)
         return self
 
 
@@ -260,32 +430,17 @@ class PauliStringLinear(PauliString):
             raise TypeError(f"Unsupported operand type(s) for @: "
                             f"'{type(self).__name__}' and '{type(other).__name__}'")
 
-        new_pauli_terms = []
-
-        # Distributive multiplication: Loop through all pairs of terms.
-        # We now loop over `self` and `other` directly.
-        for self_coeff, self_pauli in self:
-            for other_coeff, other_pauli in other:
-
-                # Step 1: Calculate the phase of the Pauli product (P1 * P2)
-                phase = self_pauli.sign(other_pauli)
-
-                # Step 2: Calculate the resulting Pauli string (the phase-less product)
-                product_pauli_string = self_pauli.multiply(other_pauli)
-
-                # Step 3: Calculate the new term's overall coefficient: a * b * phase
-                new_coeff = self_coeff * other_coeff * phase
-
-                # Step 4: Append the new (coefficient, PauliString) tuple
-                new_pauli_terms.append((new_coeff, product_pauli_string))
-
-        # If there are no resulting terms, return a zero operator
-        if not new_pauli_terms:
-            size = self.get_size() if self.get_size() > 0 else other.get_size()
+        size = self.get_size() if self.get_size() > 0 else other.get_size()
+        if len(self) == 0 or len(other) == 0:
             return p([(0.0, 'I' * size)])
 
-        # Create a new PauliStringLinear and simplify it to collect common terms
-        return p(new_pauli_terms).simplify()
+        # All phases and phase-less products of the pairs of terms are computed at once
+        # on the packed representation and the duplicates are combined by a sort reduction.
+        packed, coeffs = multiply_outer(*self.get_packed(), *other.get_packed())
+        mask = np.abs(coeffs) > TOLERANCE
+        if not mask.any():
+            return p([(0.0, 'I' * size)])
+        return get_pauli_string_linear(packed[mask], coeffs[mask])
 
     def __rmatmul__(self, other:PauliString):
         """
@@ -307,17 +462,13 @@ class PauliStringLinear(PauliString):
         """
         Performs scalar multiplication: self * scalar.
         """
-        # pylint: disable=import-outside-toplevel
-        from paulie.common.pauli_string_factory import get_pauli_string as p
-
         # Check that we are multiplying by a number
         if not isinstance(scalar, (int, float, complex)):
             # Let Python know this operation is not implemented for other types
             return NotImplemented
 
-        # Create a new list of terms where each coefficient is scaled by the number
-        new_terms = [(coeff * scalar, pauli) for coeff, pauli in self]
-        return p(new_terms)
+        # Scale each coefficient of a copy of the canonical map or of the packed form
+        return self._map_coefficients(lambda coeff: coeff * scalar)
 
     @property
     def h(self) -> 'PauliStringLinear':
@@ -326,11 +477,7 @@ class PauliStringLinear(PauliString):
         This is found by taking the complex conjugate of all coefficients,
         as the Pauli matrices themselves are Hermitian.
         """
-        # Use a list comprehension to create the new list of terms
-        conjugated_combinations = [
-            (np.conj(coeff), pauli) for coeff, pauli in self.combinations
-        ]
-        return PauliStringLinear(conjugated_combinations)
+        return self._map_coefficients(np.conj)
 
     def multiply(self, other:PauliString|Self) -> Self:
         """
@@ -501,23 +648,131 @@ class PauliStringLinear(PauliString):
         # Retrieve the Pauli strings that anticommute with self.
         raise PauliStringLinearException("Not implemented")
 
-    def get_matrix(self) -> np.array:
+    def _get_groups(self) -> dict[int, list[tuple[int, complex]]]:
+        """
+        Group the terms by the X-part of their Pauli string.
+        All terms of a group move the basis state b to b ^ x, so that they act together
+        as one diagonal matrix followed by one permutation.
+        Returns a map from the X-mask to the list of tuples (Z-mask, coefficient * i^nY)
+        """
+        groups = {}
+        for coeff, pauli in self:
+            x, z = pauli.get_masks()
+            groups.setdefault(x, []).append((z, coeff * pauli.get_phase()))
+        return groups
+
+    def _gen_diagonals(self) -> Generator[tuple[int, np.ndarray], None, None]:
+        """
+        For every X-mask x of the terms yield the diagonal d with
+        self = sum_x P_x diag(d), where P_x is the permutation |b> -> |b ^ x>
+        """
+        indices = get_basis_indices(self.get_size())
+        for x, terms in self._get_groups().items():
+            diagonal = np.zeros(len(indices), dtype=complex)
+            for z, coeff in terms:
+                diagonal += coeff * get_signs(indices, z)
+            yield x, diagonal
+
+    def get_matrix(self, sparse: bool = False) -> np.array:
         """
         Get matrix representation for Pauli string
+        Args:
+            sparse: If True, then the matrix is returned as a scipy CSR array
+                    with one entry per row and distinct X-part of the terms
         Returns: Matrix representation for the Pauli string
         """
+        rows = get_basis_indices(self.get_size())
+        size = len(rows)
+        if sparse:
+            parts = [(rows ^ np.uint64(x), diagonal) for x, diagonal in self._gen_diagonals()]
+            if not parts:
+                return coo_array((size, size), dtype=complex).tocsr()
+            cols = np.concatenate([part[0] for part in parts]).astype(np.int64)
+            data = np.concatenate([part[1][part[0]] for part in parts])
+            rows = np.tile(rows.astype(np.int64), len(parts))
+            return coo_array((data, (rows, cols)), shape=(size, size)).tocsr()
+        matrix = np.zeros((size, size), dtype=complex)
+        for x, diagonal in self._gen_diagonals():
+            cols = rows ^ np.uint64(x)
+            matrix[rows, cols] = diagonal[cols]
+        return matrix
+
+    def apply(self, state: np.ndarray) -> np.ndarray:
+        """
+        Apply the linear combination to a state vector without forming its matrix.
+        The terms sharing an X-part are applied together, so the cost is O(2^n)
+        per term plus O(2^n) per distinct X-part.
+        Args:
+            state: State vector of shape (2^n,) or matrix of shape (2^n, k) of state vectors
+        Returns self @ state
+        """
+        state = np.asarray(state)
+        indices = get_basis_indices(self.get_size())
+        if state.shape[0] != len(indices):
+            raise PauliStringLinearException("Incorrect state size")
+        result = np.zeros(state.shape, dtype=np.result_type(state, complex))
+        shape = (-1, *[1] * (state.ndim - 1))
+        for x, diagonal in self._gen_diagonals():
+            cols = indices ^ np.uint64(x)
+            result += diagonal[cols].reshape(shape) * state[cols]
+        return result
 
-        return reduce(lambda matrix, c: matrix + c[0] * c[1].get_matrix()
-                      if matrix is not None else c[0] * c[1].get_matrix(), self, None)
+    def get_linear_operator(self) -> LinearOperator:
+        """
+        Get the linear combination as a matrix-free scipy LinearOperator
+        """
+        size = 1 << self.get_size()
+        adjoint = self.h
+        return LinearOperator((size, size), matvec=self.apply, rmatvec=adjoint.apply,
+                              matmat=self.apply, rmatmat=adjoint.apply, dtype=complex)
 
-    def exponential(self) -> np.array:
+    def exponential(self, sparse: bool = False) -> np.array:
         """
-        returns the exponential of a linear combination of Paulistrings
-        Returns:
+        returns the matrix exponential of a linear combination of Paulistrings
+        Args:
+            sparse: If True, then the exponential of the sparse matrix is returned as a CSC array
+        Returns: Matrix exponential exp(self)
+        """
+        if sparse:
+            return sparse_expm(self.get_matrix(sparse=True).tocsc())
+        return expm(self.get_matrix())
 
+    def evolve(self, state: np.ndarray, t: float = 1.0, method: str = "taylor",
+               steps: int = 1, order: int = 2) -> np.ndarray:
         """
-        matrix = self.get_matrix()
-        return np.exp(matrix)
+        Apply the time evolution exp(-i t self) to a state vector without forming a matrix
+        Args:
+            state: State vector of shape (2^n,) or matrix of shape (2^n, k) of state vectors
+            t: Evolution time
+            method: "taylor" for the truncated Taylor series with scaling of
+                    scipy.sparse.linalg.expm_multiply on the matrix-free operator,
+                    "trotter" for a product formula over the Pauli terms
+            steps: Number of Trotter steps, at least 1
+            order: Order of the product formula, 1 (Lie-Trotter) or 2 (Strang)
+        Returns exp(-i t self) @ state
+        """
+        state = np.asarray(state)
+        if method == "taylor":
+            return expm_multiply(-1j * t * self.get_linear_operator(), state,
+                                 traceA=-1j * t * self.trace())
+        if method != "trotter":
+            raise PauliStringLinearException(f"Unknown evolution method {method}")
+        if order not in (1, 2):
+            raise PauliStringLinearException("Only product formulas of order 1 and 2 are supported")
+        if steps < 1:
+            raise ValueError("The number of Trotter steps must be at least 1")
+        terms = list(self)
+        dt = t / steps
+        if order == 2:
+            dt /= 2
+        result = state.astype(np.result_type(state, complex))
+        for _ in range(steps):
+            for coeff, pauli in terms:
+                result = _evolve_term(result, coeff, pauli, dt)
+            if order == 2:
+                for coeff, pauli in reversed(terms):
+                    result = _evolve_term(result, coeff, pauli, dt)
+        return result
 
     def simplify(self) -> 'PauliStringLinear':
         """
@@ -525,24 +780,25 @@ class PauliStringLinear(PauliString):
         Removes terms with coefficients close to zero.
         This version assumes the PauliStringLinear object is directly iterable.
         """
-        # pylint: disable=import-outside-toplevel
-        from paulie.common.pauli_string_factory import get_pauli_string as p
-        if not self.combinations:
+        if not self.terms:
             return self
 
-        summed_coeffs = defaultdict(complex)
-        for coeff, pauli in self.combinations:
-            summed_coeffs[str(pauli)] += coeff
-
-        simplified_list = [
-            (coeff, pauli_str) for pauli_str, coeff in summed_coeffs.items()
-            if abs(coeff) > 1e-12
-        ]
-
-        if not simplified_list:
-            return p([(0.0, 'I' * self.get_size())])
+        # Equal Pauli strings are already combined by the canonical storage
+        simplified = self.copy().prune()
+        if not simplified.terms:
+            return PauliStringLinear([(0.0, 'I' * self.get_size())])
+        return simplified
 
-        return p(simplified_list)
+    def get_packed(self) -> tuple[PauliStringPacked, np.ndarray]:
+        """
+        Get the packed representation of the linear combination
+        Returns the packed Pauli strings and the vector of their complex coefficients
+        """
+        if self._packed is None:
+            terms = self.terms
+            self._packed = get_packed_from_keys(list(terms), self.n)
+            self._coeffs = np.array(list(terms.values()), dtype=complex)
+        return self._packed, self._coeffs
 
     def trace(self) -> complex:
         """
@@ -554,14 +810,13 @@ class PauliStringLinear(PauliString):
         Returns:
             The complex value of the trace.
         """
-        identity_coeff = 0.0  # Initialize the coefficient of the Identity operator
-
-        # Loop through the terms to find the coefficient of the Identity string
-        for coeff, pauli in self:
-            # The PauliString class should have an `is_identity()` method
-            if pauli.is_identity():
-                identity_coeff = coeff
-                break  # Found it, no need to look further
+        if self._terms is None:
+            # The Identity string has no X-bits and no Z-bits
+            identity = ~(self._packed.x | self._packed.z).any(axis=1)
+            identity_coeff = complex(self._coeffs[identity].sum())
+        else:
+            # The index of the Identity string is 0
+            identity_coeff = self._terms.get(0, 0.0)
 
         # If there was no identity term, its coefficient is zero, so trace is zero.
         if identity_coeff == 0:
@@ -578,14 +833,7 @@ class PauliStringLinear(PauliString):
         """
         Get the length of the Pauli Strings in this linear combination.
         """
-        # Assuming the internal list of terms is accessible via iteration
-        try:
-            # Get the first term to determine the size
-            _, first_pauli = next(iter(self))
-            return len(first_pauli)
-        except StopIteration:
-            # Handle the case of an empty linear combination
-            return 0
+        return self.n
 
     def is_zero(self) -> bool:
         """
@@ -595,7 +843,7 @@ class PauliStringLinear(PauliString):
         Returns:
             True if the linear combination is zero, False otherwise.
         """
-        return all(abs(coeff) < 1e-12 for coeff, _ in self)
+        return bool(np.all(np.abs(self._get_coefficients()) < TOLERANCE))
 
     def norm(self) -> float:
         """
@@ -604,5 +852,28 @@ class PauliStringLinear(PauliString):
         Pauli strings in the linear combination.
         """
         # Sum the squared magnitudes of all coefficients
-        sum_of_squares = sum(abs(coeff)**2 for coeff, _ in self.combinations)
+        sum_of_squares = np.sum(np.abs(self._get_coefficients())**2)
         return np.sqrt(sum_of_squares)
+
+
+def _evolve_term(state: np.ndarray, coeff: complex, pauli: PauliString,
+                 dt: float) -> np.ndarray:
+    """
+    Apply exp(-i dt coeff P) = cosh(a) I + sinh(a) P with a = -i dt coeff, since P^2 = I
+    """
+    a = -1j * dt * coeff
+    return np.cosh(a) * state + np.sinh(a) * pauli.apply(state)
+
+
+def get_pauli_string_linear(packed: PauliStringPacked,
+                            coeffs: np.ndarray) -> PauliStringLinear:
+    """
+    Build a linear combination of Pauli strings from its packed representation,
+    without creating a PauliString per term
+    Args:
+        packed: Distinct packed Pauli strings, see get_reduced
+        coeffs: Complex coefficients of the Pauli strings
+    """
+    result = PauliStringLinear([], n=packed.get_size())
+    result.set_packed(packed, coeffs)
+    return result
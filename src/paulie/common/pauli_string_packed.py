@@ -0,0 +1,417 @@
+"""
+Packed symplectic representation of a batch of Pauli strings.
+The whole batch lives in two contiguous uint64 matrices (X-part and Z-part),
+one row per Pauli string, so that commutation relations of many strings
+are computed by vectorized popcount kernels instead of Python loops.
+"""
+from typing import Self
+import numpy as np
+from bitarray import bitarray
+from paulie.common.pauli_string_bitarray import PauliString
+
+WORD_SIZE = 64
+BLOCK_SIZE = 1 << 22
+
+
+class PauliStringPackedException(Exception):
+    """
+    Exception for the packed batch of Pauli strings
+    """
+
+
+def get_count_words(n: int) -> int:
+    """
+    Get the number of uint64 words needed to store n qubits
+    """
+    return max(1, (n + WORD_SIZE - 1) // WORD_SIZE)
+
+
+def _pack_bytes(rows: np.ndarray, n: int) -> np.ndarray:
+    """
+    Pack rows of big-endian bytes into rows of uint64 words.
+    Qubit q is stored in word q // 64 at bit 63 - q % 64.
+    """
+    n_words = get_count_words(n)
+    padded = np.zeros((rows.shape[0], 8 * n_words), dtype=np.uint8)
+    padded[:, :rows.shape[1]] = rows
+    return padded.view(">u8").astype(np.uint64)
+
+
+def _unpack_bits(words: np.ndarray, n: int) -> np.ndarray:
+    """
+    Unpack rows of uint64 words into rows of n bits (one uint8 per qubit)
+    """
+    rows = np.ascontiguousarray(words.astype(">u8")).view(np.uint8)
+    return np.unpackbits(rows, axis=1)[:, :n]
+
+
+def _parity(words: np.ndarray) -> np.ndarray:
+    """
+    Parity of the number of set bits along the last axis
+    """
+    return np.bitwise_count(np.bitwise_xor.reduce(words, axis=-1)) & 1
+
+
+class PauliStringPacked:
+    """
+    Batch of Pauli strings stored as two uint64 matrices X and Z.
+    Row i of X (resp. Z) holds the X-part (resp. Z-part) of the i-th Pauli string.
+    """
+
+    def __init__(self, x: np.ndarray, z: np.ndarray, n: int) -> None:
+        """
+        Initialize a packed batch of Pauli strings.
+
+        Args:
+            x: Matrix of shape (count, words) with the X-parts of the strings
+            z: Matrix of shape (count, words) with the Z-parts of the strings
+            n: Length of the Pauli strings
+        """
+        if x.shape != z.shape:
+            raise PauliStringPackedException("X and Z parts must have the same shape")
+        if x.ndim != 2 or x.shape[1] != get_count_words(n):
+            raise PauliStringPackedException("Incorrect number of words for the string length")
+        self.x = np.ascontiguousarray(x, dtype=np.uint64)
+        self.z = np.ascontiguousarray(z, dtype=np.uint64)
+        self.n = n
+        self.support_index = None
+
+    def __len__(self) -> int:
+        """
+        Returns the number of Pauli strings in the batch
+        """
+        return self.x.shape[0]
+
+    def get_size(self) -> int:
+        """
+        Get the length of the Pauli strings in the batch
+        """
+        return self.n
+
+    def __getitem__(self, key: int | slice | np.ndarray) -> Self:
+        """
+        Select a sub-batch by index, slice, index array or boolean mask
+        """
+        if isinstance(key, (int, np.integer)):
+            key = [key]
+        return PauliStringPacked(self.x[key], self.z[key], self.n)
+
+    def _get_interleaved(self) -> np.ndarray:
+        """
+        Get the rows of the batch as big-endian bytes of the interleaved bits
+        [x0, z0, x1, z1, ...] of PauliString
+        """
+        x_bits = _unpack_bits(self.x, self.n)
+        z_bits = _unpack_bits(self.z, self.n)
+        return np.packbits(np.stack((x_bits, z_bits), axis=2).reshape(len(self), -1), axis=1)
+
+    def get_pauli_strings(self) -> list[PauliString]:
+        """
+        Convert the batch into a list of PauliString
+        """
+        if len(self) == 0:
+            return []
+        interleaved = self._get_interleaved()
+        pauli_strings = []
+        for row in interleaved:
+            bits = bitarray()
+            bits.frombytes(row.tobytes())
+            pauli_strings.append(PauliString(bits=bits[:2 * self.n]))
+        return pauli_strings
+
+    def get_pauli_string(self, i: int) -> PauliString:
+        """
+        Get the i-th Pauli string of the batch
+        """
+        return self[i].get_pauli_strings()[0]
+
+    def get_indices(self) -> list[int]:
+        """
+        Get the index (see PauliString.get_index) of every string of the batch
+        """
+        if len(self) == 0 or self.n == 0:
+            return [0] * len(self)
+        interleaved = self._get_interleaved()
+        pad = 8 * interleaved.shape[1] - 2 * self.n
+        if interleaved.shape[1] <= 8:
+            words = np.zeros((len(self), 8), dtype=np.uint8)
+            words[:, 8 - interleaved.shape[1]:] = interleaved
+            return (words.view(">u8").reshape(-1) >> np.uint64(pad)).tolist()
+        return [int.from_bytes(row.tobytes(), "big") >> pad for row in interleaved]
+
+    def get_keys(self) -> np.ndarray:
+        """
+        Get the rows of the batch as one matrix [X | Z] suitable for sorting and deduplication
+        """
+        return np.concatenate((self.x, self.z), axis=1)
+
+    def get_isin_mask(self, other: Self) -> np.ndarray:
+        """
+        Get the mask of the strings of this batch that are contained in other
+        """
+        if len(other) == 0:
+            return np.zeros(len(self), dtype=bool)
+        keys = np.concatenate((self.get_keys(), other.get_keys()))
+        _, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        return np.isin(inverse[:len(self)], inverse[len(self):])
+
+    def get_weights(self) -> np.ndarray:
+        """
+        Get the number of non-identity Paulis of every string in the batch
+        """
+        return np.bitwise_count(self.x | self.z).sum(axis=1, dtype=np.int64)
+
+    def multiply(self, other: Self) -> Self:
+        """
+        Row-wise phase-less product of two batches of equal size
+        """
+        return PauliStringPacked(self.x ^ other.x, self.z ^ other.z, self.n)
+
+    def anticommutes_with(self, x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """
+        Check which strings of the batch anticommute with a single Pauli string
+        Args:
+            x: X-part of the Pauli string as a row of words
+            z: Z-part of the Pauli string as a row of words
+        Returns a boolean vector
+        """
+        return _parity((self.x & z) ^ (self.z & x)).astype(bool)
+
+    def get_anticommutation_matrix(self, other: Self = None) -> np.ndarray:
+        """
+        Get the matrix A with A[i, j] True if the i-th string of this batch
+        anticommutes with the j-th string of other.
+        The computation runs in blocks of rows to bound the memory of the temporaries.
+        Args:
+            other: Batch of Pauli strings. If not specified, then this batch
+        """
+        if other is None:
+            other = self
+        if self.n != other.n:
+            raise PauliStringPackedException("Pauli strings must have the same length")
+        matrix = np.empty((len(self), len(other)), dtype=bool)
+        step = max(1, BLOCK_SIZE // max(1, len(other) * self.x.shape[1]))
+        for start in range(0, len(self), step):
+            x = self.x[start:start + step, None, :]
+            z = self.z[start:start + step, None, :]
+            matrix[start:start + step] = _parity((x & other.z[None]) ^ (z & other.x[None]))
+        return matrix
+
+    def get_commutants_mask(self, other: Self) -> np.ndarray:
+        """
+        Get the mask of the strings of this batch that commute with every string of other
+        """
+        return ~self.get_anticommutation_matrix(other).any(axis=1)
+
+    def get_anti_commutants_mask(self, other: Self) -> np.ndarray:
+        """
+        Get the mask of the strings of this batch that anticommute with every string of other
+        """
+        return self.get_anticommutation_matrix(other).all(axis=1)
+
+    def get_supports(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the positions of the non-identity Paulis of the batch.
+        Only the non-zero words are unpacked, so the cost grows with the weights of the strings.
+        Returns the arrays of rows and qubits of the positions, sorted by row and qubit
+        """
+        words = self.x | self.z
+        rows, columns = np.nonzero(words)
+        bits = _unpack_bits(words[rows, columns][:, None], WORD_SIZE)
+        positions, offsets = np.nonzero(bits)
+        return rows[positions], columns[positions] * WORD_SIZE + offsets
+
+    def get_support_index(self) -> list[np.ndarray]:
+        """
+        Get the inverted index of the supports: entry q is the sorted array of the rows
+        whose string acts non-trivially on qubit q.
+        The index is cached.
+        """
+        if self.support_index is None:
+            rows, qubits = self.get_supports()
+            order = np.argsort(qubits, kind="stable")
+            bounds = np.searchsorted(qubits[order], np.arange(self.n + 1))
+            self.support_index = [rows[order[bounds[q]:bounds[q + 1]]] for q in range(self.n)]
+        return self.support_index
+
+    def get_candidate_pairs(self) -> np.ndarray:
+        """
+        Get the pairs of rows i < j whose strings act non-trivially on a common qubit,
+        the only pairs that can anticommute.
+        Returns an integer array of shape (count_pairs, 2) sorted lexicographically
+        """
+        count = len(self)
+        keys = []
+        for rows in self.get_support_index():
+            if len(rows) > 1:
+                i, j = np.triu_indices(len(rows), k=1)
+                keys.append(rows[i] * count + rows[j])
+        if not keys:
+            return np.zeros((0, 2), dtype=np.int64)
+        keys = np.unique(np.concatenate(keys))
+        return np.stack((keys // count, keys % count), axis=1)
+
+    def get_anticommuting_pairs(self) -> np.ndarray:
+        """
+        Get the pairs of rows i < j whose strings anticommute.
+        If the supports overlap rarely, as for k-local strings on a lattice, only the pairs
+        of the support index are checked, otherwise the full anticommutation matrix is used.
+        Returns an integer array of shape (count_pairs, 2) sorted lexicographically,
+        ordered as itertools.combinations
+        """
+        count = len(self)
+        sizes = np.array([len(rows) for rows in self.get_support_index()], dtype=np.int64)
+        if np.sum(sizes * (sizes - 1)) >= count * (count - 1):
+            return np.argwhere(np.triu(self.get_anticommutation_matrix(), k=1))
+        pairs = self.get_candidate_pairs()
+        mask = np.zeros(len(pairs), dtype=bool)
+        step = max(1, BLOCK_SIZE // self.x.shape[1])
+        for start in range(0, len(pairs), step):
+            i, j = pairs[start:start + step, 0], pairs[start:start + step, 1]
+            mask[start:start + step] = _parity((self.x[i] & self.z[j]) ^ (self.z[i] & self.x[j]))
+        return pairs[mask]
+
+    def get_count_anticommuting_pairs(self) -> int:
+        """
+        Get the number of unordered pairs of strings in the batch that anticommute
+        """
+        return len(self.get_anticommuting_pairs())
+
+
+def get_packed(pauli_strings: list[PauliString], n: int = None) -> PauliStringPacked:
+    """
+    Pack a list of Pauli strings into two uint64 matrices
+    Args:
+        pauli_strings: List of Pauli strings of the same length
+        n: Length of the Pauli strings. If not specified, then the length of the first string
+    Returns the packed batch
+    """
+    if n is None:
+        n = len(pauli_strings[0]) if len(pauli_strings) > 0 else 0
+    n_bytes = (n + 7) // 8
+    count = len(pauli_strings)
+    x = np.frombuffer(b"".join(p.bits_even.tobytes() for p in pauli_strings),
+                      dtype=np.uint8).reshape(count, n_bytes)
+    z = np.frombuffer(b"".join(p.bits_odd.tobytes() for p in pauli_strings),
+                      dtype=np.uint8).reshape(count, n_bytes)
+    return PauliStringPacked(_pack_bytes(x, n), _pack_bytes(z, n), n)
+
+
+def get_packed_from_indices(indices: np.ndarray, n: int) -> PauliStringPacked:
+    """
+    Pack Pauli strings given by their index in the matrix decomposition vector
+    (see PauliString.get_index) into two uint64 matrices
+    Args:
+        indices: Array of indices
+        n: Length of the Pauli strings, at most 32
+    Returns the packed batch
+    """
+    if n > WORD_SIZE // 2:
+        raise PauliStringPackedException(f"Indices are supported up to {WORD_SIZE // 2} qubits")
+    indices = np.asarray(indices, dtype=np.uint64)
+    x = np.zeros(indices.shape[0], dtype=np.uint64)
+    z = np.zeros(indices.shape[0], dtype=np.uint64)
+    for q in range(n):
+        shift = np.uint64(WORD_SIZE - 1 - q)
+        position = np.uint64(2 * (n - 1 - q))
+        x |= ((indices >> (position + np.uint64(1))) & np.uint64(1)) << shift
+        z |= ((indices >> position) & np.uint64(1)) << shift
+    return PauliStringPacked(x[:, None], z[:, None], n)
+
+
+def get_packed_from_keys(keys: list[int], n: int) -> PauliStringPacked:
+    """
+    Pack Pauli strings of any length given by their index (see PauliString.get_index)
+    into two uint64 matrices
+    Args:
+        keys: List of indices
+        n: Length of the Pauli strings
+    Returns the packed batch
+    """
+    if n <= WORD_SIZE // 2:
+        return get_packed_from_indices(np.array(keys, dtype=np.uint64), n)
+    n_bytes = (2 * n + 7) // 8
+    rows = np.frombuffer(b"".join(k.to_bytes(n_bytes, "big") for k in keys),
+                         dtype=np.uint8).reshape(len(keys), n_bytes)
+    bits = np.unpackbits(rows, axis=1)[:, 8 * n_bytes - 2 * n:]
+    x = np.packbits(bits[:, 0::2], axis=1)
+    z = np.packbits(bits[:, 1::2], axis=1)
+    return PauliStringPacked(_pack_bytes(x, n), _pack_bytes(z, n), n)
+
+
+def get_packed_all(n: int) -> PauliStringPacked:
+    """
+    Pack all Pauli strings of length n in the order of PauliString.gen_all_pauli_strings
+    """
+    return get_packed_from_indices(np.arange(4**n, dtype=np.uint64), n)
+
+
+def _count(words: np.ndarray) -> np.ndarray:
+    """
+    Number of set bits along the last axis
+    """
+    return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+
+
+def get_reduced(packed: PauliStringPacked,
+                coeffs: np.ndarray) -> tuple[PauliStringPacked, np.ndarray]:
+    """
+    Combine the duplicate Pauli strings of a linear combination by summing their coefficients.
+    Args:
+        packed: Pauli strings of the linear combination
+        coeffs: Complex coefficients of the Pauli strings
+    Returns the distinct Pauli strings sorted by their X-part and Z-part, and their coefficients
+    """
+    if len(packed) == 0:
+        return packed, coeffs
+    keys, inverse = np.unique(packed.get_keys(), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    reduced = (np.bincount(inverse, weights=coeffs.real, minlength=len(keys))
+               + 1j * np.bincount(inverse, weights=coeffs.imag, minlength=len(keys)))
+    n_words = packed.x.shape[1]
+    return PauliStringPacked(keys[:, :n_words], keys[:, n_words:], packed.n), reduced
+
+
+def multiply_outer(a: PauliStringPacked, coeffs_a: np.ndarray,
+                   b: PauliStringPacked, coeffs_b: np.ndarray
+                   ) -> tuple[PauliStringPacked, np.ndarray]:
+    """
+    Distributive product of two linear combinations of Pauli strings.
+    The phases and Pauli strings of all products of pairs of terms are computed in one shot
+    (in blocks of rows of a to bound the memory) and the duplicates are combined.
+    The phase of P1 * P2 is (-1j)^f with f the exponent of PauliString.sign.
+    Args:
+        a: Pauli strings of the left linear combination
+        coeffs_a: Coefficients of the left linear combination
+        b: Pauli strings of the right linear combination
+        coeffs_b: Coefficients of the right linear combination
+    Returns the distinct Pauli strings of the product and their coefficients
+    """
+    if a.n != b.n:
+        raise PauliStringPackedException(
+            "Pauli arrays must have the same length for multiplication.")
+    phases = np.array([1, -1j, -1, 1j])
+    self_y_a = _count(a.z & a.x)
+    self_y_b = _count(b.z & b.x)
+    n_words = a.x.shape[1]
+    step = max(1, BLOCK_SIZE // max(1, len(b) * n_words))
+    parts = []
+    for start in range(0, len(a), step):
+        xa = a.x[start:start + step, None, :]
+        za = a.z[start:start + step, None, :]
+        x = (xa ^ b.x[None]).reshape(-1, n_words)
+        z = (za ^ b.z[None]).reshape(-1, n_words)
+        f = (2 * _count(xa & b.z[None]) + self_y_a[start:start + step, None]
+             + self_y_b[None, :]).reshape(-1) - _count(x & z)
+        coeffs = (coeffs_a[start:start + step, None] * coeffs_b[None, :]).reshape(-1)
+        coeffs *= phases[f % 4]
+        parts.append(get_reduced(PauliStringPacked(x, z, a.n), coeffs))
+    if not parts:
+        return PauliStringPacked(np.zeros((0, n_words), dtype=np.uint64),
+                                 np.zeros((0, n_words), dtype=np.uint64), a.n), np.zeros(0, complex)
+    if len(parts) == 1:
+        return parts[0]
+    x = np.concatenate([part[0].x for part in parts])
+    z = np.concatenate([part[0].z for part in parts])
+    return get_reduced(PauliStringPacked(x, z, a.n), np.concatenate([part[1] for part in parts]))
@@ -9,12 +9,12 @@ TOKENS.add(LOWCASE)
 TOKENS.add(SIZE)
 
 
-def _is_token(char: str) -> bool:
+def is_token(char: str) -> bool:
     """Check if a character is a valid token."""
     return char in TOKENS
 
 
-def _is_number(char: str) -> bool:
+def is_number(char: str) -> bool:
     """Check if a character is a number, raise exception if invalid token."""
     try:
         int(char)
@@ -25,7 +25,7 @@ def _is_number(char: str) -> bool:
         return False
 
 
-def _to_int(position: str) -> int:
+def to_int(position: str) -> int:
     """Convert string to int, raise exception if invalid."""
     try:
         return int(position)
@@ -56,7 +56,7 @@ def pauli_string_parser(pauli_string: str) -> str:
             if index == len(pauli_string) - 1:
                 raise ValueError("Invalid pauli string: missing size value after 's'")
             size_string = pauli_string[index+1:]
-            size = _to_int(size_string)
+            size = to_int(size_string)
             pauli_string = pauli_string[:index]
     except ValueError as e:
         raise e
@@ -72,12 +72,12 @@ def pauli_string_parser(pauli_string: str) -> str:
             i += 2
             p = ""
             while i < len(pauli_string):
-                if _is_token(pauli_string[i]):
+                if is_token(pauli_string[i]):
                     break
-                if _is_number(pauli_string[i]):
+                if is_number(pauli_string[i]):
                     p += pauli_string[i]
                     i += 1
-            position = _to_int(p)
+            position = to_int(p)
             # Check for valid position
             if position - len(new_pauli_string) - 1 < 0:
                 raise ValueError("Invalid pauli string: invalid position order")
@@ -0,0 +1,341 @@
+"""
+Sparse representation of a Pauli string as the sorted list of its non-identity sites.
+The memory and the cost of parsing, hashing, commutation checks and products grow with the
+weight of the string instead of its length, so that low-weight operators on lattices
+of thousands of qubits stay cheap.
+"""
+import sys
+from typing import Self
+from bitarray import bitarray
+from paulie.common.pauli_string_bitarray import PauliString
+from paulie.common.pauli_string_parser import LOWCASE, SIZE, GATES, is_token, is_number, to_int
+
+# Codes of the single-qubit Paulis, 2 * x + z as in the bits of PauliString
+CODES = {"I": 0, "Z": 1, "X": 2, "Y": 3}
+PAULIS = "IZXY"
+# Phase of the product of two single-qubit Paulis with distinct non-identity codes
+PHASES = {(2, 3): 1j, (3, 2): -1j, (3, 1): 1j, (1, 3): -1j, (1, 2): 1j, (2, 1): -1j}
+
+
+class PauliStringSparseException(Exception):
+    """
+    Exception for the sparse Pauli string
+    """
+
+
+def sparse_pauli_string_parser(pauli_string: str) -> tuple[dict[int, int], int]:
+    """
+    Parse a Pauli string representation without expanding it.
+    The notation is the one of pauli_string_parser, for example "X_4Y_7s5000".
+
+    Args:
+        pauli_string (str): String representation of a Pauli string
+
+    Returns:
+        The map from the non-identity sites to the codes of their Paulis, and the length
+
+    Raises:
+        ValueError: If the input string format is invalid
+    """
+    size = None
+    index = pauli_string.find(SIZE)
+    if index != -1:
+        if index == len(pauli_string) - 1:
+            raise ValueError("Invalid pauli string: missing size value after 's'")
+        size = to_int(pauli_string[index + 1:])
+        pauli_string = pauli_string[:index]
+    support = {}
+    length = 0
+    i = 0
+    while i < len(pauli_string):
+        if pauli_string[i] not in GATES:
+            raise ValueError("Invalid pauli string: unexpected character")
+        token = pauli_string[i]
+        if i < len(pauli_string) - 2 and pauli_string[i + 1] == LOWCASE:
+            # Handle positioned operator (e.g., X_4), the position counts from 1
+            i += 2
+            p = ""
+            while i < len(pauli_string):
+                if is_token(pauli_string[i]):
+                    break
+                if is_number(pauli_string[i]):
+                    p += pauli_string[i]
+                    i += 1
+            position = to_int(p)
+            if position - length - 1 < 0:
+                raise ValueError("Invalid pauli string: invalid position order")
+            length = position - 1
+        else:
+            i += 1
+        if token != "I":
+            support[length] = CODES[token]
+        length += 1
+    if size is not None:
+        if size < length:
+            raise ValueError("Invalid pauli string: size too small for operators")
+        length = size
+    return support, length
+
+
+class PauliStringSparse:
+    """
+    Representation of a Pauli string as a map from the sorted non-identity sites
+    to the codes of their Paulis
+    """
+
+    def __init__(self, n: int = None, pauli_str: str = None,
+                 support: dict[int, int] = None) -> None:
+        """
+        Initialize a sparse Pauli string.
+
+        Args:
+            n: length of the Pauli string
+            pauli_str: String representation of a Pauli string, see sparse_pauli_string_parser
+            support: Map from the non-identity sites to the codes 2 * x + z of their Paulis
+        """
+        length = 0
+        self.support = {}
+        if pauli_str is not None:
+            self.support, length = sparse_pauli_string_parser(pauli_str)
+        elif support is not None:
+            self.support = {site: support[site] for site in sorted(support) if support[site]}
+            length = max(self.support) + 1 if self.support else 0
+        if n is not None:
+            if n < length:
+                raise PauliStringSparseException("The length is smaller than the support")
+            length = n
+        self.n = length
+        self._index = None
+
+    def __str__(self) -> str:
+        """Convert to the dense readable string (e.g., "XYZI"), in O(n)"""
+        letters = ["I"] * self.n
+        for site, code in self.support.items():
+            letters[site] = PAULIS[code]
+        return "".join(letters)
+
+    def get_sparse_str(self) -> str:
+        """Convert to the readable positioned notation (e.g., "X_4Y_7s5000"), in O(weight)"""
+        return "".join(f"{PAULIS[code]}{LOWCASE}{site + 1}"
+                       for site, code in self.support.items()) + f"{SIZE}{self.n}"
+
+    def __repr__(self) -> str:
+        """Representation of the sparse Pauli string in the positioned notation"""
+        return f"PauliStringSparse('{self.get_sparse_str()}')"
+
+    def __len__(self) -> int:
+        """
+        Returns the lenght of the Pauli string
+        """
+        return self.n
+
+    def get_size(self) -> int:
+        """
+        Get the length of the Pauli string
+        """
+        return self.n
+
+    def get_weight(self) -> int:
+        """
+        Get the number of non-identity Paulis
+        """
+        return len(self.support)
+
+    def get_index(self) -> int:
+        """
+        Return the index of PauliString.get_index, the code of qubit q being
+        the base-4 digit n - 1 - q. The index has 2n bits and is cached.
+        """
+        if self._index is None:
+            self._index = sum(code << 2 * (self.n - 1 - site)
+                              for site, code in self.support.items())
+        return self._index
+
+    def _get_key(self) -> tuple[int, tuple[tuple[int, int], ...]]:
+        """
+        Key of the Pauli string used for equality
+        """
+        return self.n, tuple(self.support.items())
+
+    def _ensure_sparse(self, other: str | PauliString | Self) -> Self:
+        """
+        Convert a string or a dense Pauli string into a sparse Pauli string
+        """
+        if isinstance(other, PauliStringSparse):
+            return other
+        if isinstance(other, PauliString):
+            return get_sparse(other)
+        return PauliStringSparse(pauli_str=str(other))
+
+    def _ensure_same_length(self, other: Self) -> None:
+        """
+        Check that two Pauli strings have the same length
+        """
+        if self.n != other.n:
+            raise ValueError("Pauli arrays must have the same length")
+
+    def __eq__(self, other: str | PauliString | Self) -> bool:
+        """Overloading the equality operator relating two Pauli strings.
+        Args:
+             other: The Pauli string to compare with
+        Returns the result of the comparison
+        """
+        return self._get_key() == self._ensure_sparse(other)._get_key()
+
+    def __ne__(self, other: str | PauliString | Self) -> bool:
+        """
+        Overloading != operator of two Pauli strings
+        Args:
+             other: The Pauli string to compare with
+        Returns the result of the comparison
+        """
+        return not self == other
+
+    def __hash__(self) -> int:
+        """
+        Make PauliStringSparse hashable so it can be used in sets.
+        The hash is the one of the equal dense PauliString, hash(get_index()), computed
+        in O(weight) from the support as the index modulo the modulus of numeric hashing.
+        """
+        modulus = sys.hash_info.modulus
+        return sum(code * pow(4, self.n - 1 - site, modulus)
+                   for site, code in self.support.items()) % modulus
+
+    def __copy__(self) -> Self:
+        """
+        Pauli string copy operator
+        """
+        return self.copy()
+
+    def copy(self) -> Self:
+        """ Copy Pauli string """
+        return PauliStringSparse(n=self.n, support=self.support)
+
+    def __add__(self, other: str | PauliString | Self) -> Self:
+        """
+        Pauli string addition operator
+        """
+        return self.tensor(other)
+
+    def __or__(self, other: str | PauliString | Self) -> bool:
+        """
+        Overloading | operator of two Pauli strings like commutes_with
+        """
+        return self.commutes_with(other)
+
+    def __xor__(self, other: str | PauliString | Self) -> Self:
+        """
+        Overloading ^ operator of two Pauli strings like adjoint_map
+        """
+        return self.adjoint_map(other)
+
+    def __matmul__(self, other: str | PauliString | Self) -> Self:
+        """
+        Overloading @ operator of two Pauli strings like multiply
+        """
+        return self.multiply(other)
+
+    def _gen_overlap(self, other: Self):
+        """
+        Yield the codes of the sites where both Pauli strings are not the identity
+        """
+        smaller, larger = ((self.support, other.support)
+                           if len(self.support) <= len(other.support)
+                           else (other.support, self.support))
+        for site, code in smaller.items():
+            other_code = larger.get(site)
+            if other_code is not None:
+                yield (code, other_code) if smaller is self.support else (other_code, code)
+
+    def commutes_with(self, other: str | PauliString | Self) -> bool:
+        """
+        Check if this Pauli string commutes with another
+        Returns True if they commute, False if they anticommute
+        """
+        other = self._ensure_sparse(other)
+        self._ensure_same_length(other)
+        # Two non-identity Paulis anticommute iff they differ
+        return sum(1 for a, b in self._gen_overlap(other) if a != b) % 2 == 0
+
+    def sign(self, other: str | PauliString | Self) -> complex:
+        """
+        Calculates the phase of the product of two Pauli strings: self * other.
+        The product is defined as P1 * P2 = phase * P3. This method returns the phase.
+        Args:
+            other: The Pauli string to multiply with.
+        Returns:
+            The complex phase of the product (1, -1, 1j, or -1j).
+        """
+        other = self._ensure_sparse(other)
+        self._ensure_same_length(other)
+        phase = 1
+        for a, b in self._gen_overlap(other):
+            if a != b:
+                phase *= PHASES[(a, b)]
+        return phase
+
+    def multiply(self, other: str | PauliString | Self) -> Self:
+        """
+        Proportional multiplication operator of two Pauli strings
+        Returns a PauliStringSparse proportional to the multiplication
+        """
+        other = self._ensure_sparse(other)
+        self._ensure_same_length(other)
+        support = dict(self.support)
+        for site, code in other.support.items():
+            support[site] = support.get(site, 0) ^ code
+        return PauliStringSparse(n=self.n, support=support)
+
+    def adjoint_map(self, other: str | PauliString | Self) -> Self | None:
+        """
+        Compute the adjoint map ad_A(B) = [A,B]
+        Returns None if the commutator is zero (i.e., if A and B commute)
+        Otherwise returns a PauliStringSparse proportional to the commutator
+        """
+        other = self._ensure_sparse(other)
+        if self.commutes_with(other):
+            return None
+        return self.multiply(other)
+
+    def is_identity(self) -> bool:
+        """Check if this Pauli string is the identity"""
+        return not self.support
+
+    def tensor(self, other: str | PauliString | Self) -> Self:
+        """Tensor product of this Pauli string with another"""
+        other = self._ensure_sparse(other)
+        support = dict(self.support)
+        for site, code in other.support.items():
+            support[self.n + site] = code
+        return PauliStringSparse(n=self.n + other.n, support=support)
+
+    def expand(self, n: int) -> Self:
+        """
+        Increasing the size of the Pauli string by taking the tensor product
+        with identities in the end
+        Args:
+            n (int): New Pauli string length
+        Returns the Pauli string of extend length
+        """
+        return PauliStringSparse(n=n, support=self.support)
+
+    def get_pauli_string(self) -> PauliString:
+        """
+        Convert into the dense representation
+        """
+        bits = bitarray(2 * self.n)
+        bits.setall(0)
+        for site, code in self.support.items():
+            bits[2 * site] = code >> 1
+            bits[2 * site + 1] = code & 1
+        return PauliString(bits=bits)
+
+
+def get_sparse(pauli_string: PauliString) -> PauliStringSparse:
+    """
+    Convert a dense Pauli string into the sparse representation
+    """
+    support = {}
+    for site in (pauli_string.bits_even | pauli_string.bits_odd).search(1):
+        support[site] = 2 * pauli_string.bits_even[site] + pauli_string.bits_odd[site]
+    return PauliStringSparse(n=len(pauli_string), support=support)
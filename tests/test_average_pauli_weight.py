@@ -2,11 +2,16 @@
     Tests for average Pauli weight and quantum Fourier entropy
 """
 import concurrent.futures
+from itertools import product
 import numpy as np
 from tqdm import tqdm
 from matplotlib import pyplot as plt
 from paulie.application.average_pauli_weight import (quantum_fourier_entropy,
                                                     avg_pauli_weights_from_strings,
+                                                    avg_pauli_weights,
+                                                    get_weight_histogram,
+                                                    get_marginal_influences,
+                                                    pauli_spectrum_analysis,
                                                     average_pauli_weight, get_pauli_weights)
 
 
@@ -52,6 +57,48 @@ def compute_c_for_operator(args):
         return None  # Mark as zero
     return h / i
 
+def test_average_pauli_weight_implementations():
+    """
+    Test that the implementations of the average Pauli weight agree
+    """
+    for n_qubits in range(1, 4):
+        o = generate_hermitian_operator(n_qubits)
+        weights = get_pauli_weights(n_qubits, identity_pos=0)
+        expected = average_pauli_weight(o, weights=weights)
+        pauli_strings = list(product('IXYZ', repeat=n_qubits))
+        assert np.isclose(avg_pauli_weights_from_strings(o, pauli_strings), expected)
+        assert np.isclose(avg_pauli_weights(o), expected)
+
+def test_pauli_spectrum_analysis():
+    """
+    Test the analytics of the Pauli spectrum against the per-string definitions
+    """
+    n_qubits = 3
+    pauli_strings = [''.join(s) for s in product('IXYZ', repeat=n_qubits)]
+    assert list(get_pauli_weights(n_qubits)) == [
+        sum(c != 'I' for c in s) for s in pauli_strings]
+    o = generate_hermitian_operator(n_qubits)
+    analysis = pauli_spectrum_analysis(o)
+    probs = np.abs(analysis["coefficients"]) ** 2
+    histogram = np.zeros(n_qubits + 1)
+    marginal = np.zeros(n_qubits)
+    for s, prob in zip(pauli_strings, probs):
+        histogram[sum(c != 'I' for c in s)] += prob
+        for q, c in enumerate(s):
+            marginal[q] += prob if c != 'I' else 0
+    assert np.allclose(analysis["histogram"], histogram)
+    assert np.allclose(get_weight_histogram(analysis["coefficients"]), histogram)
+    assert np.allclose(analysis["marginal_influences"], marginal)
+    assert np.allclose(get_marginal_influences(analysis["coefficients"]), marginal)
+    assert np.isclose(analysis["influence"], average_pauli_weight(o))
+    assert np.isclose(analysis["influence"], np.sum(marginal))
+    assert np.isclose(analysis["entropy"], quantum_fourier_entropy(o))
+    for dtype in (np.complex64, np.float32):
+        assert np.isclose(quantum_fourier_entropy(o, dtype=dtype), analysis["entropy"],
+                          atol=1e-3)
+        assert np.isclose(average_pauli_weight(o, dtype=dtype), analysis["influence"],
+                          atol=1e-3)
+
 if __name__ == "__main__":
     print("--- Testing the Conjecture: H(O) <= c * I(O) ---")
     TRIAL_COUNT = 10000
@@ -0,0 +1,56 @@
+"""
+Test membership and index lookups of a collection of Pauli strings
+"""
+from itertools import product
+from paulie.common.pauli_string_factory import get_pauli_string as p
+from paulie.common.pauli_string_collection import PauliStringCollection
+
+def test_membership_and_index() -> None:
+    """
+    Test that the hash index follows appends, inserts and removals
+    while preserving the insertion order
+    """
+    collection = PauliStringCollection()
+    for s in ["XY", "ZZ", "XY", "IX", "ZZ"]:
+        collection.append(p(s))
+    assert [str(g) for g in collection.get()] == ["XY", "ZZ", "IX"]
+    assert p("ZZ") in collection and "IX" in collection
+    assert p("YY") not in collection
+    assert collection.index(p("IX")) == 2
+    assert collection.find(p("YY")) == -1
+    collection.insert(0, p("YY"))
+    collection.insert(1, p("ZZ"))
+    assert [str(g) for g in collection.get()] == ["YY", "XY", "ZZ", "IX"]
+    assert collection.index(p("ZZ")) == 2
+    collection.remove(p("XY"))
+    assert p("XY") not in collection
+    assert collection.find(p("IX")) == 2
+    collection.replace(p("IX"), p("XX"))
+    assert collection.index(p("XX")) == 2 and p("IX") not in collection
+    del collection[0]
+    assert collection.index(p("ZZ")) == 0
+
+def test_k_local_construction() -> None:
+    """
+    Test that a large k-local collection is built without duplicates
+    """
+    n = 300
+    generators = p(["XY", "XZ", "XY"], n=n)
+    assert len(generators) == 2 * (n - 1)
+    for s in ["XY", "XZ"]:
+        for k in range(n - 1):
+            assert generators.index(p("I" * k + s + "I" * (n - k - 2))) == \
+                (k if s == "XY" else n - 1 + k)
+
+def test_append_many() -> None:
+    """
+    Test that appending thousands of Pauli strings keeps them unique and ordered
+    """
+    strings = ["".join(s) for s in product("IXYZ", repeat=6)]
+    collection = PauliStringCollection()
+    for s in strings + strings[::-1]:
+        collection.append(p(s))
+    assert len(collection) == len(strings)
+    assert [str(g) for g in collection.get()] == strings
+    collection.append(p("XY"))
+    assert collection.index(p("XYIIII")) == strings.index("XYIIII")
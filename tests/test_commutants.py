@@ -0,0 +1,47 @@
+"""
+Test the commutant of a collection of Pauli strings
+"""
+import pytest
+from paulie.common.pauli_string_factory import get_pauli_string as p
+from paulie.common.random_pauli_strings import get_random_list
+from paulie.application.charges import non_commuting_charges
+
+@pytest.mark.parametrize("generators", [
+    ["X"], ["XY", "XZ"], ["XX", "YY", "ZZ"], ["ZI", "IZ", "XX"],
+    ["XI", "IX", "YI", "IY", "ZZ"], get_random_list(4, 3), get_random_list(5, 2),
+])
+def test_commutants_match_naive(generators: list[str]) -> None:
+    """
+    Test that the commutants found by linear algebra are all Pauli strings
+    that commute with every generator, in order of their bit value
+    """
+    collection = p(generators)
+    all_paulis = p("I" * collection.get_size()).get_commutants()
+    expected = [q for q in all_paulis if all(g | q for g in collection.get())]
+    assert collection.get_commutants().get() == expected
+    assert sorted(collection.gen_commutants()) == expected
+    assert 2 ** len(collection.get_commutants(basis=True)) == len(expected)
+
+def test_commutant_basis_large_system() -> None:
+    """
+    Test the basis of the commutant on a system that cannot be enumerated
+    """
+    n = 40
+    collection = p(["XX", "YY"], n=n)
+    basis = collection.get_commutants(basis=True)
+    assert len(basis) == 2
+    for q in basis.get():
+        assert all(g | q for g in collection.get())
+    # The commutant of the XX, YY chain is {I, X...X, Y...Y, Z...Z}
+    expected = sorted(p(c * n) for c in "IXYZ")
+    assert sorted(collection.gen_commutants()) == expected
+
+@pytest.mark.parametrize("algebra", [["XX", "XZ"], ["XY", "XZ"]])
+def test_non_commuting_charges_match_naive(algebra: list[str]) -> None:
+    """
+    Test that the charges are the commutants that anticommute with another commutant
+    """
+    collection = p(algebra)
+    commutants = collection.get_commutants().get()
+    expected = [c for c in commutants if any(not c | q for q in commutants)]
+    assert non_commuting_charges(collection).get() == expected
@@ -123,3 +123,16 @@ def test_complex_commutation_matrix(pauli_setup:dict[str,PauliString]) -> None:
 def test_multi_qubit_products(pauli_setup:dict[str,PauliString]) -> None:
     """Test products of multi-qubit Pauli strings."""
     assert pauli_setup["IXIXI"] ^ pauli_setup["IYXII"] == pauli_setup["IZXXI"]
+
+def test_hash_and_order() -> None:
+    """Test hashing, equality and ordering by the integer key of Pauli strings."""
+    assert p("XY") == "XY"
+    assert p("XY") != p("XYI")
+    assert p("I") != p("II")
+    assert len({p("XY"), p("XY"), p("YX"), p("XYI")}) == 3
+    assert sorted([p("ZI"), p("IX"), p("YY"), p("XZ")]) == [p("IX"), p("ZI"), p("XZ"), p("YY")]
+    q = p("III")
+    key = hash(q)
+    q[1] = "X"
+    assert q == p("IXI") and hash(q) != key
+    assert q.inc() == p("IXZ")
@@ -0,0 +1,110 @@
+"""
+    Tests for the implicit commutator graph
+"""
+import numpy as np
+import pytest
+import networkx as nx
+from paulie.common.pauli_string_factory import get_pauli_string as p
+from paulie.common.get_graph import get_graph
+from paulie.common.commutator_graph import CommutatorGraph
+
+generators_list = [
+    ["X"], ["XX", "YY", "ZZ"],
+    ["ZI", "IZ", "XX"],
+    ["XY", "YX", "YZ", "ZY"],
+    ["XI", "IX", "YI", "IY", "ZZ"],
+    ["ZII", "IZI", "IIZ", "XXI", "IXX"],
+]
+
+def naive_commutator_graph(generators: list[str]) -> nx.Graph:
+    """
+    Build the commutator graph over all Pauli strings with networkx
+    """
+    g = p(generators)
+    all_paulis = p("I" * g.get_size()).get_commutants()
+    vertices, edges = get_graph(all_paulis, commutators=g, flag_labels=False)
+    graph = nx.Graph()
+    graph.add_nodes_from(vertices)
+    graph.add_edges_from(edges)
+    return graph
+
+@pytest.mark.parametrize("generators", generators_list)
+def test_commutator_graph_matches_naive(generators: list[str]) -> None:
+    """
+    Test that the implicit commutator graph has the edges, components
+    and shortest path lengths of the explicit graph
+    """
+    g = p(generators)
+    graph = naive_commutator_graph(generators)
+    vertices, edges = g.get_commutator_graph()
+    assert vertices == list(graph.nodes)
+    assert {frozenset(e) for e in edges} == {frozenset(e) for e in graph.edges}
+    implicit = g.get_implicit_commutator_graph()
+    components = implicit.get_connected_components()
+    assert [{str(v) for v in c} for c in components] == list(nx.connected_components(graph))
+    for v in p("I" * g.get_size()).get_commutants():
+        assert implicit.get_shortest_path_lengths(v) == nx.shortest_path_length(graph, str(v))
+        assert {str(u) for u in implicit.get_neighbours(v)} == set(graph.neighbors(str(v)))
+
+@pytest.mark.parametrize("generators", generators_list)
+def test_frame_potential(generators: list[str]) -> None:
+    """
+    Test the frame potential against the explicit commutator graph
+    """
+    graph = naive_commutator_graph(generators)
+    expected = nx.number_connected_components(graph) * len(list(nx.isolates(graph)))
+    assert p(generators).get_frame_potential() == expected
+
+def test_shortest_path_large_system() -> None:
+    """
+    Test a shortest path in the commutator graph of a 30 qubit chain,
+    where the graph cannot be enumerated
+    """
+    n = 30
+    implicit = p(["XX", "ZI", "IZ"], n=n).get_implicit_commutator_graph()
+    source = p("X", n=n)
+    target = p("Z" * (n - 1) + "Y")
+    path = implicit.get_shortest_path(source, target)
+    assert path[0] == source
+    assert path[-1] == target
+    for a, b in zip(path, path[1:]):
+        assert b in implicit.get_neighbours(a)
+    assert implicit.get_component_size(source) == 2 * n
+
+@pytest.mark.parametrize("generators", generators_list)
+def test_vectorized_layers_match_scalar(generators: list[str]) -> None:
+    """
+    Test that the frontier-at-a-time search finds the layers of the scalar search
+    """
+    g = p(generators)
+    vectorized = CommutatorGraph(g.get())
+    scalar = CommutatorGraph(g.get(), vectorized=False)
+    assert vectorized.is_vectorized()
+    assert not scalar.is_vectorized()
+    for v in p("I" * g.get_size()).get_commutants():
+        assert vectorized.get_shortest_path_lengths(v) == scalar.get_shortest_path_lengths(v)
+        assert vectorized.get_layer_sizes(v) == scalar.get_layer_sizes(v)
+        assert sorted(vectorized.get_component_array(v).tolist()) == \
+            sorted(scalar.get_component_keys(v))
+    assert ([{str(u) for u in c} for c in vectorized.get_connected_components()] ==
+            [{str(u) for u in c} for c in scalar.get_connected_components()])
+
+@pytest.mark.parametrize("n", [3, 5, 7])
+def test_component_ids_match_search(n: int) -> None:
+    """
+    Test that the labelling of the whole index space finds the components of the search
+    """
+    implicit = p(["XX", "YY", "ZI", "IZ"], n=n).get_implicit_commutator_graph()
+    component_ids = implicit.get_component_ids()
+    assert len(component_ids) == 4**n
+    visited = set()
+    count = 0
+    for key in range(4**n):
+        if key in visited:
+            continue
+        component = implicit.get_component_keys(implicit.get_pauli_string(key))
+        visited.update(component)
+        assert set(component_ids[component].tolist()) == {count}
+        count += 1
+    assert component_ids.max() + 1 == count
+    assert implicit.get_component_sizes() == np.bincount(component_ids).tolist()
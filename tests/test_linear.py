@@ -0,0 +1,179 @@
+"""
+Test the linear combinations of Pauli strings
+"""
+import numpy as np
+import pytest
+from scipy.linalg import expm
+from paulie.common.pauli_string_factory import get_pauli_string as p
+from paulie.common.pauli_string_linear import PauliStringLinear
+from paulie.common.pauli_string_packed import PauliStringPacked
+from paulie.common.random_pauli_strings import get_random_list
+
+def random_linear(n: int, count: int, seed: int):
+    """
+    Random linear combination of Pauli strings with complex coefficients
+    """
+    rng = np.random.default_rng(seed)
+    coeffs = rng.normal(size=count) + 1j * rng.normal(size=count)
+    return p(list(zip(coeffs.tolist(), get_random_list(n, count))))
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4])
+def test_product_matches_matrices(n: int) -> None:
+    """
+    Test that the product of linear combinations is the product of their matrices
+    """
+    a = random_linear(n, 7, 1)
+    b = random_linear(n, 5, 2)
+    assert np.allclose((a @ b).get_matrix(), a.get_matrix() @ b.get_matrix())
+
+def test_product_matches_term_products() -> None:
+    """
+    Test the batched product against the products of the terms on 70 qubits
+    """
+    a = random_linear(70, 12, 3)
+    b = random_linear(70, 9, 4)
+    expected = {}
+    for ca, pa in a:
+        for cb, pb in b:
+            key = str(pa @ pb)
+            expected[key] = expected.get(key, 0) + ca * cb * pa.sign(pb)
+    result = {str(pauli): coeff for coeff, pauli in a @ b}
+    assert result.keys() == {k for k, v in expected.items() if abs(v) > 1e-12}
+    for key, coeff in result.items():
+        assert np.isclose(coeff, expected[key])
+
+def test_product_stays_packed(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that chained products, scaling, trace and norm run on the packed form
+    without creating a PauliString per term
+    """
+    a = random_linear(70, 12, 5)
+    b = random_linear(70, 9, 6)
+    c = random_linear(70, 6, 7)
+    expected = (a @ b) @ c
+    expected_terms = dict(expected.terms)
+
+    def fail(*_):
+        raise AssertionError("PauliString built per term")
+    monkeypatch.setattr(PauliStringPacked, "get_pauli_strings", fail)
+    monkeypatch.setattr(PauliStringLinear, "_get_term", fail)
+    product = (2 * (a @ b) @ c.h.h).prune()
+    assert len(product) == len(expected)
+    assert np.isclose(product.norm(), 2 * expected.norm())
+    assert product.trace() == 2 * expected.trace()
+    assert product.terms.keys() == expected_terms.keys()
+    for key, coeff in product.terms.items():
+        assert np.isclose(coeff, 2 * expected_terms[key])
+
+def test_product_cancellation() -> None:
+    """
+    Test that cancelling terms give the zero operator
+    """
+    assert str(p([(1, "XI")]) @ p([(1, "XI")])) == "1*II"
+    assert (p([(1, "X"), (1, "Y")]) @ p([(1, "X"), (-1, "Y")])) == p([(-2j, "Z")])
+    assert (p([(1, "XY")]) @ p([(0.0, "ZZ")])).is_zero()
+
+def test_canonical_storage() -> None:
+    """
+    Test that equal Pauli strings are combined on construction
+    """
+    a = p([(1, "XY"), (2, "ZZ"), (0.5j, "XY")])
+    assert len(a) == 2
+    assert a.combinations == [(1 + 0.5j, p("XY")), (2, p("ZZ"))]
+    assert a.trace() == 0
+    assert p([(3, "II"), (1, "XX")]).trace() == 12
+    b = p("XY")
+    c = p([(1, b)])
+    b.set_substring(0, "Z")
+    assert c == p([(1, "XY")])
+    with pytest.raises(ValueError):
+        p([(1, "I"), (1, "II")])
+    with pytest.raises(ValueError):
+        c.axpy(1, p([(1, "XYZ")]))
+
+def test_in_place_accumulation() -> None:
+    """
+    Test in-place addition, scaled accumulation and pruning
+    """
+    a = p([(1, "XY"), (2, "ZZ")])
+    b = p([(-1, "XY"), (1, "IX")])
+    result = a
+    result += b
+    assert result is a
+    assert a == p([(2, "ZZ"), (1, "IX")])
+    a.axpy(2j, p([(1, "ZZ"), (1, "YY")]))
+    assert a == p([(2 + 2j, "ZZ"), (1, "IX"), (2j, "YY")])
+    a.axpy(-1, p([(1, "IX")]))
+    assert len(a) == 2
+    a.axpy(1, p([(1e-3, "XX")]))
+    assert len(a.prune(1e-2)) == 2
+    assert (p([(1, "XY")]) + p([(-1, "XY")])).is_zero()
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5])
+def test_sparse_and_matrix_free(n: int) -> None:
+    """
+    Test the sparse matrix and the matrix-free action against the dense matrix
+    """
+    a = random_linear(n, 9, 5)
+    dense = sum(c * pauli.get_matrix() for c, pauli in a)
+    assert np.allclose(a.get_matrix(), dense)
+    assert np.allclose(a.get_matrix(sparse=True).toarray(), dense)
+    for _, pauli in a:
+        assert np.allclose(pauli.get_matrix(sparse=True).toarray(), pauli.get_matrix())
+    rng = np.random.default_rng(6)
+    state = rng.normal(size=(1 << n, 2)) + 1j * rng.normal(size=(1 << n, 2))
+    assert np.allclose(a.apply(state), dense @ state)
+    assert np.allclose(a.apply(state[:, 0]), dense @ state[:, 0])
+    operator = a.get_linear_operator()
+    assert np.allclose(operator @ state[:, 0], dense @ state[:, 0])
+    assert np.allclose(operator.H @ state[:, 0], dense.conj().T @ state[:, 0])
+
+def test_apply_large_system() -> None:
+    """
+    Test the matrix-free action of a 20 qubit Ising Hamiltonian on a basis state
+    """
+    n = 20
+    hamiltonian = p(
+        [(1.0, "I" * i + "ZZ" + "I" * (n - i - 2)) for i in range(n - 1)]
+        + [(0.5, "I" * i + "X" + "I" * (n - i - 1)) for i in range(n)])
+    state = np.zeros(1 << n, dtype=complex)
+    state[0] = 1
+    result = hamiltonian.apply(state)
+    assert np.isclose(result[0], n - 1)
+    assert np.allclose(result[[1 << (n - 1 - i) for i in range(n)]], 0.5)
+    assert np.isclose(np.linalg.norm(result) ** 2, (n - 1) ** 2 + n * 0.25)
+
+def test_exponential() -> None:
+    """
+    Test that the exponential is the matrix exponential
+    """
+    a = p([(0.3, "XY"), (-0.2j, "ZI")])
+    assert np.allclose(a.exponential(), expm(a.get_matrix()))
+    assert np.allclose(a.exponential(sparse=True).toarray(), expm(a.get_matrix()))
+    assert np.allclose(p([(0.5j, "X")]).exponential(),
+                       np.cos(0.5) * np.eye(2) + 1j * np.sin(0.5) * p("X").get_matrix())
+
+@pytest.mark.parametrize("method,steps,order,tol", [
+    ("taylor", 1, 2, 1e-8), ("trotter", 200, 1, 1e-2), ("trotter", 50, 2, 1e-3)])
+def test_evolve(method: str, steps: int, order: int, tol: float) -> None:
+    """
+    Test the time evolution of a state against the dense matrix exponential
+    """
+    n = 4
+    hamiltonian = p([(1.0, "ZZII"), (1.0, "IZZI"), (1.0, "IIZZ"),
+                     (0.7, "XIII"), (0.7, "IXII"), (0.7, "IIXI"), (0.7, "IIIX")])
+    rng = np.random.default_rng(7)
+    state = rng.normal(size=1 << n) + 1j * rng.normal(size=1 << n)
+    state /= np.linalg.norm(state)
+    expected = expm(-1.5j * hamiltonian.get_matrix()) @ state
+    result = hamiltonian.evolve(state, t=1.5, method=method, steps=steps, order=order)
+    assert np.linalg.norm(result - expected) < tol
+    assert np.isclose(np.linalg.norm(result), 1)
+
+@pytest.mark.parametrize("steps", [0, -1])
+def test_evolve_invalid_steps(steps: int) -> None:
+    """
+    Test that a product formula needs at least one step
+    """
+    with pytest.raises(ValueError):
+        p([(1.0, "XZ")]).evolve(np.array([1, 0, 0, 0]), method="trotter", steps=steps)
@@ -5,7 +5,12 @@ import pytest
 import numpy as np
 from paulie.application.matrix_decomposition import (
     matrix_decomposition,
-    matrix_decomposition_diagonal
+    matrix_decomposition_diagonal,
+    matrix_decomposition_memmap,
+    inverse_matrix_decomposition,
+    inverse_matrix_decomposition_diagonal,
+    pauli_decomposition,
+    pauli_coefficients
 )
 from paulie.common.pauli_string_factory import get_pauli_string as p
 
@@ -84,3 +89,141 @@ def test_pauli_string_diagonal_matrices(paulistr: str) -> None:
     # Non-zero entry must be equal to 1 and in correct position
     assert np.real(pstr.get_weight_in_matrix(decomp)) == pytest.approx(1.0)
     assert np.imag(pstr.get_weight_in_matrix(decomp)) == pytest.approx(0.0)
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4])
+def test_random_matrix_reconstruction(n: int) -> None:
+    """
+    Assert that the weights of matrix_decomposition and matrix_decomposition_diagonal
+    reconstruct a random matrix from the Pauli strings
+    """
+    rng = np.random.default_rng(n)
+    matrix = rng.normal(size=(1 << n, 1 << n)) + 1j * rng.normal(size=(1 << n, 1 << n))
+    decomp = matrix_decomposition(matrix)
+    paulis = p("I" * n).get_commutants()
+    reconstruction = sum(pstr.get_weight_in_matrix(decomp) * pstr.get_matrix() for pstr in paulis)
+    assert np.allclose(reconstruction, matrix)
+    diagonal_decomp = matrix_decomposition_diagonal(np.diag(matrix))
+    diagonal_paulis = [pstr for pstr in paulis if set(str(pstr)) <= {"I", "Z"}]
+    reconstruction = sum(pstr.get_weight_in_matrix(diagonal_decomp) * pstr.get_matrix()
+                         for pstr in diagonal_paulis)
+    assert np.allclose(reconstruction, np.diag(np.diag(matrix)))
+
+def test_output_buffer() -> None:
+    """
+    Assert that matrix_decomposition writes into a supplied buffer
+    """
+    rng = np.random.default_rng(0)
+    out = np.empty(4 ** 3, dtype=np.complex128)
+    for _ in range(3):
+        matrix = rng.normal(size=(8, 8))
+        expected = matrix_decomposition(matrix)
+        assert matrix_decomposition(matrix, out=out) is out
+        assert np.allclose(out, expected)
+    with pytest.raises(ValueError):
+        matrix_decomposition(np.eye(8), out=np.empty(4 ** 2, dtype=np.complex128))
+
+def test_batched_decomposition() -> None:
+    """
+    Assert that stacks of matrices and diagonals are decomposed like single ones
+    """
+    rng = np.random.default_rng(1)
+    matrices = rng.normal(size=(5, 8, 8)) + 1j * rng.normal(size=(5, 8, 8))
+    decomp = matrix_decomposition(matrices)
+    assert decomp.shape == (5, 64)
+    diagonals = rng.normal(size=(5, 16))
+    diagonal_decomp = matrix_decomposition_diagonal(diagonals)
+    assert diagonal_decomp.shape == (5, 16)
+    for i in range(5):
+        assert np.allclose(decomp[i], matrix_decomposition(matrices[i]))
+        assert np.allclose(diagonal_decomp[i], matrix_decomposition_diagonal(diagonals[i]))
+    out = np.empty((5, 64), dtype=np.complex128)
+    assert matrix_decomposition(matrices, out=out) is out
+    assert np.allclose(out, decomp)
+    with pytest.raises(ValueError):
+        matrix_decomposition(np.zeros((2, 2, 8, 8)))
+
+def test_inverse_decomposition() -> None:
+    """
+    Assert that the inverse transforms reconstruct the matrices and diagonals
+    """
+    rng = np.random.default_rng(2)
+    for n in range(1, 5):
+        matrices = rng.normal(size=(3, 1 << n, 1 << n)) + 1j * rng.normal(size=(3, 1 << n, 1 << n))
+        decomp = matrix_decomposition(matrices)
+        assert np.allclose(inverse_matrix_decomposition(decomp), matrices)
+        assert np.allclose(inverse_matrix_decomposition(decomp[0]), matrices[0])
+        diagonals = rng.normal(size=(3, 1 << n))
+        diagonal_decomp = matrix_decomposition_diagonal(diagonals)
+        assert np.allclose(inverse_matrix_decomposition_diagonal(diagonal_decomp), diagonals)
+    pstr = p("XYZ")
+    weights = np.zeros(4 ** 3)
+    weights[pstr.get_index()] = 1
+    assert np.allclose(inverse_matrix_decomposition(weights), pstr.get_matrix())
+    with pytest.raises(ValueError):
+        inverse_matrix_decomposition(np.zeros(8))
+
+def test_pauli_decomposition() -> None:
+    """
+    Assert that the thresholded decomposition keeps the significant terms
+    """
+    hamiltonian = p([(1.0, "ZZI"), (0.5, "IXX"), (-0.25j, "YIZ"), (1e-14, "XXX")])
+    matrix = hamiltonian.get_matrix()
+    result = pauli_decomposition(matrix)
+    assert result == p([(1.0, "ZZI"), (0.5, "IXX"), (-0.25j, "YIZ")])
+    assert [str(pauli) for _, pauli in result] == ["ZZI", "IXX", "YIZ"]
+    assert pauli_decomposition(matrix, top_k=2) == p([(1.0, "ZZI"), (0.5, "IXX")])
+    assert pauli_decomposition(matrix, tol=0.6) == p([(1.0, "ZZI")])
+    assert len(pauli_decomposition(matrix, tol=2)) == 0
+    pauli_strings, weights = pauli_decomposition(matrix, packed=True)
+    assert pauli_strings.get_pauli_strings() == [p("ZZI"), p("IXX"), p("YIZ")]
+    assert np.allclose(weights, [1.0, 0.5, -0.25j])
+
+@pytest.mark.parametrize("n", [1, 4, 5, 6])
+@pytest.mark.parametrize("block_size", [1, 128, 1 << 20])
+def test_memmap_decomposition(n: int, block_size: int, tmp_path) -> None:
+    """
+    Assert that the out-of-core decomposition of a memory-mapped matrix
+    matches matrix_decomposition
+    """
+    rng = np.random.default_rng(n)
+    matrix = rng.normal(size=(1 << n, 1 << n)) + 1j * rng.normal(size=(1 << n, 1 << n))
+    np.save(tmp_path / "matrix.npy", matrix)
+    weights = matrix_decomposition_memmap(str(tmp_path / "matrix.npy"),
+                                          str(tmp_path / "weights.npy"), block_size=block_size)
+    assert isinstance(weights, np.memmap)
+    assert np.allclose(weights, matrix_decomposition(matrix))
+    assert np.allclose(np.load(tmp_path / "weights.npy"), matrix_decomposition(matrix))
+
+def test_pauli_coefficients() -> None:
+    """
+    Assert that the selected weights match the full decomposition
+    """
+    rng = np.random.default_rng(3)
+    n = 4
+    matrix = rng.normal(size=(1 << n, 1 << n)) + 1j * rng.normal(size=(1 << n, 1 << n))
+    decomp = matrix_decomposition(matrix)
+    paulis = p("I" * n).get_commutants()
+    weights = pauli_coefficients(matrix, paulis)
+    assert np.allclose(weights, [pstr.get_weight_in_matrix(decomp) for pstr in paulis])
+    selected = ["XYZI", "IIII", "ZZZZ", "YIIX"]
+    weights = pauli_coefficients(matrix, selected)
+    assert np.allclose(weights, [p(s).get_weight_in_matrix(decomp) for s in selected])
+
+@pytest.mark.parametrize("dtype", [np.complex64, np.float64, np.float32])
+def test_decomposition_precision(dtype) -> None:
+    """
+    Assert that the reduced and real precision modes match the default decomposition
+    of Hermitian matrices
+    """
+    rng = np.random.default_rng(4)
+    matrix = rng.normal(size=(16, 16)) + 1j * rng.normal(size=(16, 16))
+    hermitian = matrix + matrix.conj().T
+    decomp = matrix_decomposition(hermitian, dtype=dtype)
+    assert decomp.dtype == dtype
+    assert np.allclose(decomp, matrix_decomposition(hermitian), atol=1e-5)
+    batched = matrix_decomposition(np.stack([hermitian, hermitian.real]), dtype=dtype)
+    assert np.allclose(batched[1], matrix_decomposition(hermitian.real), atol=1e-5)
+    diagonal_decomp = matrix_decomposition_diagonal(np.diag(hermitian), dtype=dtype)
+    assert diagonal_decomp.dtype == dtype
+    assert np.allclose(diagonal_decomp, matrix_decomposition_diagonal(np.diag(hermitian)),
+                       atol=1e-5)
@@ -6,7 +6,7 @@ import numpy as np
 import networkx as nx
 from paulie.common.pauli_string_collection import PauliStringCollection
 from paulie.common.pauli_string_bitarray import PauliString
-from paulie.application.otoc import average_otoc
+from paulie.application.otoc import OtocEngine, average_otoc
 from paulie.common.pauli_string_factory import (
     get_pauli_string as p,
     get_identity
@@ -62,6 +62,23 @@ def test_average_otoc_matches_naive(generators: list[str]) -> None:
         for w in all_paulis:
             assert average_otoc(g, v, w) == pytest.approx(naive_otoc(g, v, w))
 
+@pytest.mark.parametrize("generators", generators_list)
+def test_otoc_engine(generators: list[str]) -> None:
+    """
+    Test that the cached engine agrees with average_otoc and discovers every component once.
+    """
+    g = p(generators)
+    i = get_identity(len(generators[0]))
+    all_paulis = i.get_commutants()
+    engine = OtocEngine(g)
+    for v in all_paulis:
+        values = engine.average_otocs(v, all_paulis)
+        for w, value in zip(all_paulis, values):
+            assert value == pytest.approx(average_otoc(g, v, w))
+            assert engine.average_otoc(v, w) == pytest.approx(value)
+    assert sum(len(c) for c in engine.components) == len(all_paulis)
+    assert len(engine.component_of) == len(all_paulis)
+
 @pytest.mark.parametrize("generators", generators_list)
 def test_average_otoc_is_symmetric(generators: list[str]) -> None:
     """
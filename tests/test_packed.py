@@ -0,0 +1,96 @@
+"""
+Test the packed symplectic representation of Pauli strings
+"""
+from itertools import combinations
+import numpy as np
+import pytest
+from paulie.common.pauli_string_factory import get_pauli_string as p
+from paulie.common.pauli_string_packed import get_packed, get_packed_all
+from paulie.common.random_pauli_strings import get_random_list
+
+@pytest.mark.parametrize("n", [1, 3, 7, 64, 65, 130])
+def test_packed_round_trip(n: int) -> None:
+    """
+    Test that packing and unpacking recovers the Pauli strings
+    """
+    pauli_strings = [p(s) for s in get_random_list(n, 20)]
+    packed = get_packed(pauli_strings)
+    assert len(packed) == 20
+    assert packed.get_pauli_strings() == pauli_strings
+
+@pytest.mark.parametrize("n", [2, 5, 64, 100])
+def test_anticommutation_matrix(n: int) -> None:
+    """
+    Test that the anticommutation matrix matches the pairwise commutation check
+    """
+    pauli_strings = [p(s) for s in get_random_list(n, 30)]
+    matrix = get_packed(pauli_strings).get_anticommutation_matrix()
+    for i, a in enumerate(pauli_strings):
+        for j, b in enumerate(pauli_strings):
+            assert matrix[i, j] == (not a | b)
+
+def test_packed_all() -> None:
+    """
+    Test that all Pauli strings are packed in the order of gen_all_pauli_strings
+    """
+    all_paulis = p("III").get_commutants()
+    assert get_packed_all(3).get_pauli_strings() == all_paulis
+
+@pytest.mark.parametrize("generators", [["XY", "XZ"], ["XX", "YY", "ZZ"], ["XI", "IX", "YY"]])
+def test_collection_kernels(generators: list[str]) -> None:
+    """
+    Test the vectorized collection kernels against the Pauli string loops
+    """
+    collection = p(generators, n=4)
+    pairs = list(combinations(collection.get(), 2))
+    expected = sum(1 for a, b in pairs if not a | b) / len(pairs)
+    assert collection.get_anticommutation_fraction() == pytest.approx(expected)
+    all_paulis = p("IIII").get_commutants()
+    commutants = [q for q in all_paulis if all(g | q for g in collection.get())]
+    assert collection.get_commutants().get() == commutants
+    anti_commutants = [q for q in all_paulis if all(not g | q for g in collection.get())]
+    assert collection.get_anti_commutants().get() == anti_commutants
+
+def naive_graph(generators: list, commutators: list) -> tuple[list, dict]:
+    """
+    Build the anticommutation graph with a loop over all pairs of generators
+    """
+    edges = []
+    labels = {}
+    for a, b in combinations(generators, 2):
+        c = a ^ b
+        if c and (len(commutators) == 0 or c in commutators):
+            edges.append((str(a), str(b)))
+            labels[(str(a), str(b))] = str(c)
+    return edges, labels
+
+@pytest.mark.parametrize("n", [3, 6, 70])
+def test_graph_matches_naive(n: int) -> None:
+    """
+    Test that the vectorized anticommutation graph matches the pair loop
+    """
+    generators = p(get_random_list(n, 25))
+    commutators = generators.get()[:12]
+    for area in [None, commutators, [str(c) for c in commutators]]:
+        vertices, edges, labels = generators.get_graph(area)
+        assert vertices == [str(g) for g in generators.get()]
+        assert (edges, labels) == naive_graph(generators.get(), area or [])
+
+@pytest.mark.parametrize("n", [5, 70, 200])
+def test_support_index_pairs(n: int) -> None:
+    """
+    Test that the anticommuting pairs found through the support index of a k-local
+    collection match the full anticommutation matrix
+    """
+    collection = p(["XY", "ZZ", "X"], n=n)
+    packed = collection.get_packed()
+    index = collection.get_support_index()
+    for q in range(n):
+        assert index[q].tolist() == [i for i, g in enumerate(collection.get())
+                                     if str(g)[q] != "I"]
+    expected = np.argwhere(np.triu(packed.get_anticommutation_matrix(), k=1))
+    assert np.array_equal(packed.get_anticommuting_pairs(), expected)
+    assert len(packed.get_candidate_pairs()) < len(collection) ** 2
+    pairs = list(combinations(collection.get(), 2))
+    expected_fraction = sum(1 for a, b in pairs if not a | b) / len(pairs)
+    assert collection.get_anticommutation_fraction() == pytest.approx(expected_fraction)
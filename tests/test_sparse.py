@@ -0,0 +1,83 @@
+"""
+Test the sparse representation of Pauli strings
+"""
+from itertools import combinations
+import pytest
+from paulie.common.pauli_string_factory import get_pauli_string as p
+from paulie.common.pauli_string_factory import get_sparse_pauli_string as sp
+from paulie.common.pauli_string_sparse import PauliStringSparseException
+from paulie.common.random_pauli_strings import get_random_list
+
+@pytest.mark.parametrize("notation", ["XYZI", "X_4s10", "ZYX_5Ys7", "I_3", "Z_2Y_7"])
+def test_sparse_parser(notation: str) -> None:
+    """
+    Test that the sparse parser agrees with the dense parser
+    """
+    sparse = sp(notation)
+    dense = p(notation)
+    assert str(sparse) == str(dense)
+    assert len(sparse) == len(dense)
+    assert sparse.get_pauli_string() == dense
+    assert sp(sparse.get_sparse_str()) == sparse
+    with pytest.raises(ValueError):
+        sp(notation + "W")
+
+@pytest.mark.parametrize("n", [1, 4, 9, 40])
+def test_sparse_matches_dense(n: int) -> None:
+    """
+    Test hashes, commutation, products, phases and adjoint maps against the dense
+    representation
+    """
+    dense = [p(s) for s in get_random_list(n, 12)]
+    sparse = sp(dense)
+    for a, sa in zip(dense, sparse):
+        assert sa == a
+        assert hash(sa) == hash(a)
+        assert sp(str(a)) == sa
+    for (a, sa), (b, sb) in combinations(zip(dense, sparse), 2):
+        assert (sa | sb) == (a | b)
+        assert sa.sign(sb) == a.sign(b)
+        assert (sa @ sb).get_pauli_string() == a @ b
+        if a | b:
+            assert sa ^ sb is None
+        else:
+            assert (sa ^ sb).get_pauli_string() == a ^ b
+        assert (sa + sb).get_pauli_string() == a + b
+
+def test_sparse_hash() -> None:
+    """
+    Test hashing and equality of sparse Pauli strings
+    """
+    a = sp("X_4Y_7s5000")
+    b = sp("IIIXIIXs5000") @ sp("Z_7s5000")
+    assert a == b
+    assert len({a, b, a.copy()}) == 1
+    assert a != a.expand(5001)
+    assert sp("X_4s5000") != sp("Y_4s5000")
+    dense = p("IIIXIIYII")
+    sparse = sp("X_4Y_7s9")
+    assert sparse == dense
+    assert hash(sparse) == hash(dense)
+    assert sparse.get_index() == dense.get_index()
+    assert len({sparse, dense}) == 1
+    assert {dense: 1}[sparse] == 1
+
+def test_sparse_large() -> None:
+    """
+    Test low-weight strings on thousands of qubits
+    """
+    n = 5000
+    a = sp(f"X_10Z_2000s{n}")
+    b = sp(f"Z_10Z_4999s{n}")
+    assert a.get_weight() == 2
+    assert not a | b
+    assert a.sign(b) == -1j
+    assert a ^ b == sp(f"Y_10Z_2000Z_4999s{n}")
+    assert a.get_pauli_string() | b.get_pauli_string() == a | b
+    assert sp(a.get_pauli_string()) == a
+    assert hash(a) == hash(a.get_pauli_string())
+    assert a.get_sparse_str() == f"X_10Z_2000s{n}"
+    with pytest.raises(ValueError):
+        _ = a | sp("X_10s100")
+    with pytest.raises(PauliStringSparseException):
+        sp("X_10", n=5)
@@ -0,0 +1,40 @@
+"""
+    Tests for the Pauli expectation spectrum and the stabilizer Rényi entropy
+"""
+import numpy as np
+import pytest
+from paulie.application.matrix_decomposition import matrix_decomposition
+from paulie.application.stabilizer_entropy import (pauli_expectations,
+                                                   stabilizer_renyi_entropy)
+
+def random_state(n: int, seed: int) -> np.ndarray:
+    """
+    Random normalized state vector
+    """
+    rng = np.random.default_rng(seed)
+    state = rng.normal(size=1 << n) + 1j * rng.normal(size=1 << n)
+    return state / np.linalg.norm(state)
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5])
+def test_expectations_match_density_matrix(n: int) -> None:
+    """
+    Test the expectations against the decomposition of the density matrix
+    """
+    state = random_state(n, n)
+    rho = np.outer(state, np.conj(state))
+    expected = matrix_decomposition(rho).real * (1 << n)
+    assert np.allclose(pauli_expectations(state), expected)
+    assert np.allclose(pauli_expectations(state, block_size=1), expected)
+
+def test_stabilizer_renyi_entropy() -> None:
+    """
+    Test the entropy of stabilizer states and of the T state
+    """
+    zero = np.array([1, 0, 0, 0], dtype=complex)
+    bell = np.array([1, 0, 0, 1], dtype=complex) / np.sqrt(2)
+    for state in (zero, bell):
+        for alpha in (1, 2, 3):
+            assert np.isclose(stabilizer_renyi_entropy(state, alpha), 0)
+    t_state = np.array([1, np.exp(1j * np.pi / 4)]) / np.sqrt(2)
+    assert np.isclose(stabilizer_renyi_entropy(t_state), np.log2(4 / 3))
+    assert stabilizer_renyi_entropy(random_state(4, 0)) > 0